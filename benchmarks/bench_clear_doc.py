@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Benchmark for HTTPDomain.clear_doc.
+
+    Clears a handful of documents out of a synthetic domain with many
+    endpoints, once through the docname index and once through the
+    full scan over all entries that clear_doc used to do.
+
+    Usage: python benchmarks/bench_clear_doc.py [ENDPOINTS] [DOCS]
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from sphinx_http_domain import HTTPDomain
+from sphinx_http_domain.records import MethodEntry
+
+
+def make_data(endpoints, docs):
+    """Returns domain data with *endpoints* methods spread over *docs*."""
+    data = {'method': {}, 'response': {}, 'routes': {}, 'docnames': {},
+            'references': {}}
+    for i in range(endpoints):
+        docname = 'api/doc%d' % (i % docs)
+        name = 'get-resource%d-id' % i
+        sig = 'GET /resource%d/{id}' % i
+        data['method'][name] = MethodEntry(docname, sig, sig, 'GET')
+        data['docnames'].setdefault(docname, set()).add(('method', name))
+    return data
+
+
+def legacy_clear_doc(data, docname):
+    for typ in ('method', 'response'):
+        for name, entry in list(data[typ].items()):
+            if entry.docname == docname:
+                del data[typ][name]
+
+
+def indexed_clear_doc(data, docname):
+    domain = HTTPDomain.__new__(HTTPDomain)
+    domain.data = data
+    domain.clear_doc(docname)
+
+
+def bench(func, endpoints, docs, cleared):
+    data = make_data(endpoints, docs)
+    start = time.time()
+    for i in range(cleared):
+        func(data, 'api/doc%d' % i)
+    return time.time() - start
+
+
+def main(argv):
+    endpoints = int(argv[1]) if len(argv) > 1 else 20000
+    docs = int(argv[2]) if len(argv) > 2 else 1500
+    cleared = min(docs, 200)
+    print('clearing %d of %d documents, %d endpoints' %
+          (cleared, docs, endpoints))
+    for label, func in (('full scan', legacy_clear_doc),
+                        ('docname index', indexed_clear_doc)):
+        print('%-14s %8.4fs' % (label, bench(func, endpoints, docs, cleared)))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Benchmark for HTTPDomain.resolve_xref.
+
+    Resolves many references from a few overview documents to a few
+    hundred endpoints: through make_refnode without looking the target
+    up, through the domain's resolve_xref with its relative URIs
+    computed for every reference, and with them cached.
+
+    Usage: python benchmarks/bench_resolve.py [ENDPOINTS] [REFERENCES]
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from docutils.nodes import literal
+from sphinx.util.nodes import make_refnode
+from sphinx.util.osutil import relative_uri
+
+from sphinx_http_domain import HTTPDomain
+from sphinx_http_domain.records import MethodEntry
+
+
+class Builder(object):
+    """Computes relative URIs like the standalone HTML builder."""
+    def get_target_uri(self, docname, typ=None):
+        return docname + '.html'
+
+    def get_relative_uri(self, from_, to, typ=None):
+        return relative_uri(self.get_target_uri(from_),
+                            self.get_target_uri(to, typ))
+
+
+def make_domain(endpoints):
+    domain = HTTPDomain.__new__(HTTPDomain)
+    domain.env = None
+    domain.data = {'method': {}, 'response': {}, 'routes': {},
+                   'docnames': {}, 'references': {}}
+    domain.clear_caches()
+    domain._uris = {}
+    domain._uris_builder = None
+    for i in range(endpoints):
+        sig = 'GET /api/v1/resource%d/{id}' % i
+        name = 'get-api-v1-resource%d-id' % i
+        domain.data['method'][name] = MethodEntry('api/section%d/doc%d'
+                                                  % (i % 10, i), sig, sig,
+                                                  'GET',
+                                                  anchor='method-' + name)
+    return domain
+
+
+def legacy_resolve_xref(domain, fromdocname, builder, typ, target,
+                        contnode):
+    entry = domain.data[typ][target]
+    nodetype = type(contnode)
+    if issubclass(nodetype, literal):
+        nodetype = domain.directives[typ].nodetype
+    contnode = nodetype(entry.title, entry.title)
+    return make_refnode(builder, fromdocname, entry.docname,
+                        typ + '-' + target, contnode, entry.sig)
+
+
+def uncached_resolve_xref(domain, fromdocname, builder, typ, target,
+                          contnode):
+    domain._uris_builder = None
+    return domain.resolve_xref(None, fromdocname, builder, typ, target,
+                               None, contnode)
+
+
+def cached_resolve_xref(domain, fromdocname, builder, typ, target,
+                        contnode):
+    return domain.resolve_xref(None, fromdocname, builder, typ, target,
+                               None, contnode)
+
+
+def run(resolve, domain, references):
+    builder = Builder()
+    names = sorted(domain.data['method'])
+    start = time.time()
+    for i in range(references):
+        name = names[i % len(names)]
+        fromdocname = 'overview/page%d' % (i % 5)
+        resolve(domain, fromdocname, builder, 'method', name,
+                literal(name, name))
+    return time.time() - start
+
+
+def main(argv):
+    endpoints = int(argv[1]) if len(argv) > 1 else 300
+    references = int(argv[2]) if len(argv) > 2 else 50000
+    print('%d references to %d endpoints' % (references, endpoints))
+    for label, resolve in (('make_refnode', legacy_resolve_xref),
+                           ('uncached', uncached_resolve_xref),
+                           ('cached', cached_resolve_xref)):
+        elapsed = run(resolve, make_domain(endpoints), references)
+        print('%-13s %8.4fs' % (label, elapsed))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Benchmark for parsing HTTP method signatures.
+
+    Parses a large corpus of signatures with the single-pass tokenizer in
+    sphinx_http_domain.signatures and with the original three-pass parser
+    (signature RE, urlsplit, path RE), and checks that both agree wherever
+    the original parser understands the method.
+
+    Usage: python benchmarks/bench_signatures.py [SIGNATURES] [REPEATS]
+"""
+
+from __future__ import print_function
+
+import os
+import re
+import sys
+import time
+from urlparse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from sphinx_http_domain.signatures import ParsedSignature, parse_signature
+
+import corpus
+
+
+legacy_sig_re = re.compile(r'^(?:(GET|POST|PUT|DELETE)\s+)?(.+)\s*$',
+                           re.IGNORECASE)
+legacy_path_re = re.compile(r'([^{]*)(\{[^}]*\})?')
+
+
+def legacy_parse_signature(sig):
+    m = legacy_sig_re.match(sig)
+    if m is None:
+        return None
+    method, url = m.groups()
+    _, _, path, query, fragment = urlsplit(url)
+    segments = tuple((text, arg[1:-1] if arg else None)
+                     for text, arg in legacy_path_re.findall(path)[:-1])
+    return ParsedSignature(method, url, path, segments, query,
+                           tuple(query.split('&')) if query else (),
+                           fragment)
+
+
+def make_signatures(count):
+    sigs = []
+    for i in range(count):
+        method, path, sig = corpus.method_signature(i // 50, i % 50)
+        sigs.append(sig)
+    return sigs
+
+
+def run(parse, sigs, repeats):
+    start = time.time()
+    for _ in range(repeats):
+        for sig in sigs:
+            parse(sig)
+    return time.time() - start
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 20000
+    repeats = int(argv[2]) if len(argv) > 2 else 5
+    sigs = make_signatures(count)
+    for sig in sigs:
+        assert parse_signature(sig) == legacy_parse_signature(sig), sig
+    print('%d signatures, %d repeats' % (count, repeats))
+    print('%-12s %8.4fs' % ('three-pass', run(legacy_parse_signature, sigs,
+                                             repeats)))
+    print('%-12s %8.4fs' % ('single-pass', run(parse_signature, sigs,
+                                              repeats)))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Micro-benchmark for slugify and slugify_url.
+
+    Slugifies a corpus of signatures and response names with repeats,
+    comparing the memoized implementation against the original one and
+    checking that both produce the same slugs.
+
+    Usage: python benchmarks/bench_slugify.py [UNIQUE] [REPEATS]
+"""
+
+from __future__ import print_function
+
+import os
+import re
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from sphinx_http_domain import utils
+
+
+_strip_re = re.compile(r'[^\w\s-]')
+_strip_url_re = re.compile(r'[^\w\s/?=&#;{}-]')
+_hyphenate_re = re.compile(r'[^\w]+')
+
+
+def legacy_slugify(value, strip_re=_strip_re):
+    if not isinstance(value, unicode):
+        value = unicode(value)
+    value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore')
+    value = unicode(strip_re.sub('', value).strip().lower())
+    return _hyphenate_re.sub('-', value)
+
+
+def legacy_slugify_url(value):
+    return legacy_slugify(value, strip_re=_strip_url_re)
+
+
+def make_corpus(unique):
+    corpus = []
+    for i in range(unique):
+        corpus.append((True, u'get-/orgs/{org}/repos/%d/issues?state=open' % i))
+        corpus.append((False, u'Foobar object %d' % i))
+        corpus.append((False, u'Caf\xe9 r\xe9ponse %d' % i))
+    return corpus
+
+
+def run(corpus, repeats, slugify, slugify_url):
+    start = time.time()
+    for _ in range(repeats):
+        for is_url, value in corpus:
+            if is_url:
+                slugify_url(value)
+            else:
+                slugify(value)
+    return time.time() - start
+
+
+def main(argv):
+    unique = int(argv[1]) if len(argv) > 1 else 1000
+    repeats = int(argv[2]) if len(argv) > 2 else 20
+    corpus = make_corpus(unique)
+    for is_url, value in corpus:
+        if is_url:
+            assert utils.slugify_url(value) == legacy_slugify_url(value)
+        else:
+            assert utils.slugify(value) == legacy_slugify(value)
+    print('%d values, %d repeats' % (len(corpus), repeats))
+    print('%-9s %8.4fs' % ('original', run(corpus, repeats, legacy_slugify,
+                                          legacy_slugify_url)))
+    utils._slugify_cache.clear()
+    print('%-9s %8.4fs' % ('memoized', run(corpus, repeats, utils.slugify,
+                                          utils.slugify_url)))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
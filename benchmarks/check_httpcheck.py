@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Check the httpcheck builder against a local stand-in server.
+
+    Builds a synthetic API corpus with the httpcheck builder, against a
+    server on a free local port which answers every request with 200,
+    and reports the results by state.  Exits with status 1 if any
+    method could not be requested at all.
+
+    Usage: python benchmarks/check_httpcheck.py [--docs 10] [--workers 4]
+"""
+
+from __future__ import print_function, with_statement
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from sphinx.application import Sphinx
+
+import corpus
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        body = '{}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--docs', type=int, default=10)
+    parser.add_argument('--methods', type=int, default=20)
+    parser.add_argument('-w', '--workers', type=int, default=4)
+    args = parser.parse_args(argv[1:])
+
+    server = Server(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.setDaemon(True)
+    thread.start()
+    samples = dict(('%s_id' % resource, 42) for resource in corpus.RESOURCES)
+    conf_extra = ('http_check_base_url = %r\n'
+                  'http_check_samples = %r\n'
+                  'http_check_workers = %d\n' %
+                  ('http://127.0.0.1:%d/' % server.server_address[1],
+                   samples, args.workers))
+
+    workdir = tempfile.mkdtemp(prefix='http-domain-check-')
+    try:
+        srcdir = os.path.join(workdir, 'src')
+        outdir = os.path.join(workdir, 'out')
+        corpus.generate(srcdir, docs=args.docs, methods=args.methods,
+                        conf_extra=conf_extra)
+        app = Sphinx(srcdir, srcdir, outdir,
+                     os.path.join(outdir, '.doctrees'), 'httpcheck',
+                     status=None, warning=None, freshenv=True)
+        start = time.time()
+        app.build()
+        elapsed = time.time() - start
+        with open(os.path.join(outdir, 'httpcheck.txt')) as f:
+            lines = f.readlines()
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    states = {}
+    unreachable = 0
+    for line in lines:
+        state = line.split('[', 1)[1].split(']', 1)[0]
+        states[state] = states.get(state, 0) + 1
+        if state == 'broken' and line.rstrip().split(' ')[-1] == '-':
+            unreachable += 1
+    print('%d requests in %.2fs' % (len(Handler.requests), elapsed))
+    for state in sorted(states):
+        print('%-13s %5d' % (state, states[state]))
+    return 1 if unreachable or not Handler.requests else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
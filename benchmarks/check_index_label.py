@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Check that :ref:`http-endpoints` links to the endpoint index.
+
+    Builds a small project referring to the index with warnings turned
+    into errors, and looks for the link in the written page.  Exits with
+    status 1 if the build fails or the link is missing.
+
+    Usage: python benchmarks/check_index_label.py [--builder html]
+"""
+
+from __future__ import print_function, with_statement
+
+import argparse
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from sphinx.application import Sphinx
+from sphinx.errors import SphinxError
+
+
+conf = """\
+extensions = ['sphinx_http_domain']
+master_doc = 'index'
+"""
+
+index = """\
+API
+===
+
+See :ref:`http-endpoints` or :ref:`the index <http-endpoints>`.
+
+.. http:method:: GET /users/{id}
+
+   :response 200:
+"""
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--builder', default='html')
+    args = parser.parse_args(argv[1:])
+
+    workdir = tempfile.mkdtemp(prefix='http-domain-label-')
+    try:
+        srcdir = os.path.join(workdir, 'src')
+        outdir = os.path.join(workdir, 'out')
+        os.mkdir(srcdir)
+        for filename, text in (('conf.py', conf), ('index.rst', index)):
+            with codecs.open(os.path.join(srcdir, filename), 'w',
+                             'utf-8') as f:
+                f.write(text)
+        app = Sphinx(srcdir, srcdir, outdir,
+                     os.path.join(outdir, '.doctrees'), args.builder,
+                     status=None, warningiserror=True, freshenv=True)
+        try:
+            app.build()
+        except SphinxError, err:
+            print('build failed: %s' % err)
+            return 1
+        with codecs.open(os.path.join(outdir, 'index.html'), 'r',
+                         'utf-8') as f:
+            page = f.read()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    links = page.count('href="http-endpoints.html"')
+    if links != 2:
+        print('expected 2 links to http-endpoints.html, found %d' % links)
+        return 1
+    print('http-endpoints resolves')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Check that parallel builds give the same output as serial ones.
+
+    Builds a synthetic API corpus once serially and once with several
+    processes, and compares the written endpoint pages byte for byte.
+    Exits with status 1 if any page differs.
+
+    Usage: python benchmarks/check_parallel.py [--jobs 4] [--builder html]
+"""
+
+from __future__ import print_function, with_statement
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from sphinx.application import Sphinx
+
+import corpus
+
+
+def build(srcdir, outdir, builder, jobs):
+    app = Sphinx(srcdir, srcdir, outdir, os.path.join(outdir, '.doctrees'),
+                 builder, status=None, warning=None, freshenv=True,
+                 parallel=jobs)
+    start = time.time()
+    app.build()
+    return time.time() - start
+
+
+def read_pages(outdir):
+    pages = {}
+    apidir = os.path.join(outdir, 'api')
+    for filename in sorted(os.listdir(apidir)):
+        with open(os.path.join(apidir, filename), 'rb') as f:
+            pages[filename] = f.read()
+    return pages
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--docs', type=int, default=40)
+    parser.add_argument('--methods', type=int, default=20)
+    parser.add_argument('-j', '--jobs', type=int, default=4)
+    parser.add_argument('--builder', default='html')
+    args = parser.parse_args(argv[1:])
+
+    workdir = tempfile.mkdtemp(prefix='http-domain-parallel-')
+    try:
+        srcdir = os.path.join(workdir, 'src')
+        corpus.generate(srcdir, docs=args.docs, methods=args.methods)
+        outputs = []
+        for jobs in (1, args.jobs):
+            outdir = os.path.join(workdir, 'out-%d' % jobs)
+            elapsed = build(srcdir, outdir, args.builder, jobs)
+            print('-j %-3d %8.2fs' % (jobs, elapsed))
+            outputs.append(read_pages(outdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    serial, parallel = outputs
+    differing = [filename for filename in sorted(serial)
+                 if serial[filename] != parallel.get(filename)]
+    for filename in differing:
+        print('differs: api/%s' % filename)
+    if differing or set(serial) != set(parallel):
+        return 1
+    print('%d pages identical' % len(serial))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+    Synthetic API corpus for benchmarking the HTTP domain.
+
+    Generates a Sphinx project with a given number of documents, each
+    describing methods (with path arguments, query strings, fragments
+    and ``:resp:`` fields) and responses, and cross-referencing methods
+    and responses in other documents.
+"""
+
+from __future__ import with_statement
+
+import os
+import random
+import re
+
+
+CONF = """\
+extensions = ['sphinx_http_domain']
+master_doc = 'index'
+project = u'HTTP domain benchmark'
+%(extra)s
+"""
+
+METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+RESOURCES = ('users', 'orgs', 'repos', 'issues', 'comments', 'teams',
+             'projects', 'hooks', 'keys', 'releases')
+STATUS_CODES = ('200', '201', '204', '400', '403', '404', '409', '500')
+
+
+def method_signature(doc, i):
+    """Returns (method, path template, signature) for method *i*."""
+    method = METHODS[i % len(METHODS)]
+    depth = 1 + i % 3
+    parts = []
+    for level in range(depth):
+        resource = RESOURCES[(doc + i + level) % len(RESOURCES)]
+        parts.append('%s%d' % (resource, doc))
+        if level < depth - 1 or i % 2:
+            parts.append('{%s_id}' % resource)
+    path = '/' + '/'.join(parts)
+    url = path
+    if i % 3 == 0:
+        url += '?page=1&per_page=%d' % (10 * (i % 5 + 1))
+    if i % 7 == 0:
+        url += '#top'
+    return method, path, '%s %s' % (method, url)
+
+
+def method_block(rand, doc, i):
+    method, path, sig = method_signature(doc, i)
+    lines = ['.. http:method:: %s' % sig]
+    if i % 4 == 0:
+        lines.append('   :title: Operation %d of document %d' % (i, doc))
+    lines.append('')
+    for arg in path.split('{')[1:]:
+        lines.append('   :arg integer %s: Identifier' % arg.split('}')[0])
+    if '?' in sig:
+        lines.append('   :param integer page: Page number')
+        lines.append('   :optparam integer per_page: Page size')
+    if '#' in sig:
+        lines.append('   :fragment top: Anchor')
+    for code in rand.sample(STATUS_CODES, 3):
+        if code == '200':
+            lines.append('   :resp 200: Resource %d-%d' % (doc, i))
+        else:
+            lines.append('   :resp %s:' % code)
+    lines.extend(['', '   Method %d of document %d.' % (i, doc), ''])
+    return lines
+
+
+def response_block(doc, i):
+    return ['.. http:response:: Resource %d-%d' % (doc, i), '',
+            '   :data string id: Identifier',
+            '   :format: JSON', '',
+            '   Response %d of document %d.' % (i, doc), '']
+
+
+def reference_lines(rand, doc, docs, methods, responses, refs):
+    lines = []
+    for _ in range(refs):
+        other = rand.randrange(docs)
+        i = rand.randrange(methods)
+        method, path, sig = method_signature(other, i)
+        if i % 2:
+            # Concrete request, matched against the route template
+            target = '%s %s' % (method, re.sub(r'\{[^}]*\}', '42', path))
+        else:
+            target = '%s %s' % (method.lower(), sig.split(' ', 1)[1])
+            target = slugify_url(target)
+        lines.append('* :http:method:`%s`' % target)
+        if responses:
+            lines.append('* :http:response:`resource-%d-%d`' %
+                         (other, rand.randrange(responses)))
+    lines.append('')
+    return lines
+
+
+def slugify_url(value):
+    # Import lazily, so the corpus can be generated without Sphinx
+    from sphinx_http_domain.utils import slugify_url
+    return slugify_url(value)
+
+
+def generate(srcdir, docs=50, methods=20, responses=5, refs=20, seed=0,
+             conf_extra=''):
+    """
+    Writes a project to *srcdir* with *docs* documents, each holding
+    *methods* methods, *responses* responses and *refs* references.
+    """
+    rand = random.Random(seed)
+    if not os.path.isdir(srcdir):
+        os.makedirs(srcdir)
+    with open(os.path.join(srcdir, 'conf.py'), 'w') as f:
+        f.write(CONF % {'extra': conf_extra})
+    docnames = ['api/doc%04d' % doc for doc in range(docs)]
+    with open(os.path.join(srcdir, 'index.rst'), 'w') as f:
+        f.write('API\n===\n\n.. toctree::\n\n')
+        for docname in docnames:
+            f.write('   %s\n' % docname)
+    apidir = os.path.join(srcdir, 'api')
+    if not os.path.isdir(apidir):
+        os.makedirs(apidir)
+    for doc, docname in enumerate(docnames):
+        title = 'Document %d' % doc
+        lines = [title, '=' * len(title), '']
+        for i in range(methods):
+            lines.extend(method_block(rand, doc, i))
+        for i in range(responses):
+            lines.extend(response_block(doc, i))
+        lines.extend(reference_lines(rand, doc, docs, methods, responses,
+                                     refs))
+        with open(os.path.join(srcdir, docname + '.rst'), 'w') as f:
+            f.write('\n'.join(lines))
+    return docnames
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Benchmark the HTTP domain on a synthetic API corpus.
+
+    Generates a project with :mod:`corpus`, builds it, and times the
+    read, resolve and write phases as well as the ``slugify``,
+    ``handle_signature`` and ``resolve_xref`` hot paths.  Results are
+    written as JSON, so that runs can be compared.
+
+    With ``--jobs``, work done in worker processes is missing from the
+    hot path timings; compare hot paths on serial builds only.
+
+    Usage: python benchmarks/run.py --docs 200 --methods 30 -o run.json
+"""
+
+from __future__ import print_function, with_statement
+
+import argparse
+import cPickle as pickle
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from functools import wraps
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import sphinx
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
+
+import sphinx_http_domain
+from sphinx_http_domain import directives
+
+import corpus
+
+
+class Timers(object):
+    """Cumulative wall clock time and call counts per label."""
+    def __init__(self):
+        self.totals = {}
+        self.calls = {}
+
+    def add(self, label, elapsed):
+        self.totals[label] = self.totals.get(label, 0.0) + elapsed
+        self.calls[label] = self.calls.get(label, 0) + 1
+
+    def wrap(self, owner, attr, label):
+        """Replaces *owner.attr* with a timed version of itself."""
+        func = owner.__dict__[attr]
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(label, time.time() - start)
+        setattr(owner, attr, timed)
+
+    def as_dict(self):
+        return dict((label, {'seconds': self.totals[label],
+                             'calls': self.calls[label]})
+                    for label in self.totals)
+
+
+def instrument(timers):
+    timers.wrap(directives, 'slugify', 'slugify')
+    timers.wrap(directives, 'slugify_url', 'slugify_url')
+    timers.wrap(directives.HTTPMethod, 'handle_signature',
+                'HTTPMethod.handle_signature')
+    timers.wrap(directives.HTTPResponse, 'handle_signature',
+                'HTTPResponse.handle_signature')
+    timers.wrap(sphinx_http_domain.HTTPDomain, 'resolve_xref',
+                'HTTPDomain.resolve_xref')
+    timers.wrap(BuildEnvironment, 'resolve_references', 'resolve')
+
+
+def build(args, srcdir, outdir, timers):
+    phases = {}
+    kwargs = {'freshenv': True}
+    if args.jobs > 1:
+        kwargs['parallel'] = args.jobs
+    app = Sphinx(srcdir, srcdir, outdir, os.path.join(outdir, '.doctrees'),
+                 args.builder, status=None, warning=sys.stderr, **kwargs)
+
+    def env_updated(app, env):
+        phases['read'] = time.time() - start
+    app.connect('env-updated', env_updated)
+    start = time.time()
+    app.build()
+    total = time.time() - start
+    phases['resolve'] = timers.totals.get('resolve', 0.0)
+    phases['write'] = total - phases['read'] - phases['resolve']
+    phases['total'] = total
+    return phases
+
+
+def measure_doctrees(doctreedir):
+    """Returns the total size of the pickled doctrees and their load time."""
+    size = 0
+    start = time.time()
+    for dirpath, dirnames, filenames in os.walk(doctreedir):
+        for filename in filenames:
+            if filename.endswith('.doctree'):
+                with open(os.path.join(dirpath, filename), 'rb') as f:
+                    data = f.read()
+                size += len(data)
+                pickle.loads(data)
+    return {'bytes': size, 'unpickle_seconds': time.time() - start}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--docs', type=int, default=50)
+    parser.add_argument('--methods', type=int, default=20,
+                        help='methods per document')
+    parser.add_argument('--responses', type=int, default=5,
+                        help='responses per document')
+    parser.add_argument('--refs', type=int, default=20,
+                        help='references per document')
+    parser.add_argument('--builder', default='html')
+    parser.add_argument('-j', '--jobs', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compact-urls', action='store_true',
+                        help='build with http_compact_urls = True')
+    parser.add_argument('--workdir', help='keep the project in WORKDIR')
+    parser.add_argument('-o', '--output', help='write JSON results here')
+    args = parser.parse_args(argv[1:])
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='http-domain-bench-')
+    try:
+        srcdir = os.path.join(workdir, 'src')
+        corpus.generate(srcdir, docs=args.docs, methods=args.methods,
+                        responses=args.responses, refs=args.refs,
+                        seed=args.seed,
+                        conf_extra='http_compact_urls = %r' %
+                                   args.compact_urls)
+        timers = Timers()
+        instrument(timers)
+        outdir = os.path.join(workdir, 'out')
+        phases = build(args, srcdir, outdir, timers)
+        doctrees = measure_doctrees(os.path.join(outdir, '.doctrees'))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        'corpus': {'docs': args.docs, 'methods': args.methods,
+                   'responses': args.responses, 'refs': args.refs,
+                   'seed': args.seed},
+        'builder': args.builder,
+        'compact_urls': args.compact_urls,
+        'jobs': args.jobs,
+        'python': platform.python_version(),
+        'sphinx': sphinx.__version__,
+        'phases': phases,
+        'hot_paths': timers.as_dict(),
+        'doctrees': doctrees,
+    }
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -16,7 +16,8 @@ setup(
     author='David Zentgraf',
     author_email='deceze@gmail.com',
     packages=['sphinx_http_domain'],
-    requires=['Sphinx (>=1.0.7)'],
+    package_data={'sphinx_http_domain': ['static/*.js']},
+    requires=['Sphinx (>=1.3)'],
     zip_safe=True,
     classifiers=['Development Status :: 2 - Pre-Alpha',
                  'Environment :: Web Environment',
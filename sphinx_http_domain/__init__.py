@@ -10,19 +10,35 @@
 """
 
 from itertools import izip
+from os import path
 
-from docutils.nodes import literal, Text
+from docutils.nodes import literal, reference, Text
 
+from sphinx import addnodes
 from sphinx.locale import l_
 from sphinx.domains import Domain, ObjType
 from sphinx.roles import XRefRole
-from sphinx.util.nodes import make_refnode
 
-from sphinx_http_domain.directives import HTTPMethod, HTTPResponse
+from sphinx_http_domain.builders import (HTTPCheckBuilder,
+                                         HTTPEndpointsBuilder)
+from sphinx_http_domain.directives import (HTTPMethod, HTTPResponse,
+                                           HTTPRoutes, HTTPAutoRoutes)
+from sphinx_http_domain.indices import HTTPIndex
+from sphinx_http_domain.inventories import inventories
 from sphinx_http_domain.nodes import (desc_http_method, desc_http_url,
                                       desc_http_path, desc_http_patharg,
                                       desc_http_query, desc_http_queryparam,
                                       desc_http_fragment, desc_http_response)
+from sphinx_http_domain.profiling import (profiled, profiled_visitor,
+                                          init_profile, merge_profile,
+                                          write_profile)
+from sphinx_http_domain.routes import RouteTrie
+from sphinx_http_domain.routetables import route_table_cache
+from sphinx_http_domain.search import add_static_path, write_search_index
+from sphinx_http_domain.signatures import parse_route_key, signature_cache
+from sphinx_http_domain.wsgi import app_route_cache
+from sphinx_http_domain.suggestions import NGramIndex
+from sphinx_http_domain.utils import slugify_url
 
 
 class HTTPDomain(Domain):
@@ -36,30 +52,247 @@ class HTTPDomain(Domain):
     directives = {
         'method': HTTPMethod,
         'response': HTTPResponse,
+        'routes': HTTPRoutes,
+        'autoroutes': HTTPAutoRoutes,
     }
     roles = {
         'method': XRefRole(),
         'response': XRefRole(),
     }
+    indices = [
+        HTTPIndex,
+    ]
     initial_data = {
-        'method': {},    # name -> docname, sig, title, method
-        'response': {},  # name -> docname, sig, title
+        'method': {},    # name -> MethodEntry
+        'response': {},  # name -> ResponseEntry
+        'routes': {},    # canonical route key -> method name
+        'docnames': {},  # docname -> set of (type, name)
+        'references': {},  # docname -> set of (type, target)
     }
+    # Sphinx stores this as self.data['version'], and discards and rebuilds
+    # pickled environments whose domain data has an older version.
+    data_version = 8
+
+    def __init__(self, env):
+        Domain.__init__(self, env)
+        self.clear_caches()
+        # Relative URIs by (fromdocname, todocname), for _uris_builder
+        self._uris = {}
+        self._uris_builder = None
+        # Documents being re-read, and their targets as they were before
+        self._outdated_docnames = ()
+        self._outdated_targets = None
+        # Documents being read in this build, for merge_domaindata()
+        self._read_docnames = ()
+
+    @property
+    def routes(self):
+        """A :class:`RouteTrie` over all documented methods."""
+        if self._routes is None:
+            self._routes = RouteTrie.from_entries(self.data['method'])
+        return self._routes
+
+    def clear_caches(self):
+        """Drop indexes derived from self.data, after it has changed."""
+        # Route index over self.data['method'], built on first use
+        self._routes = None
+        # Combined index over all object types, built on first use
+        self._any_index = None
+        # NGramIndex of names by object type, built on first use
+        self._suggestions = {}
+
+    def process_doc(self, env, docname, document):
+        """Process a document after it is read by the environment."""
+        self.clear_caches()
+        # Record references, so the document can be rewritten when
+        # their targets change
+        references = set()
+        for node in document.traverse(addnodes.pending_xref):
+            if node.get('refdomain') == self.name:
+                references.add((node['reftype'], node['reftarget']))
+        if references:
+            self.data['references'][docname] = references
 
     def clear_doc(self, docname):
         """Remove traces of a document from self.data."""
-        for typ in self.initial_data:
-            for name, entry in self.data[typ].items():
-                if entry[0] == docname:
-                    del self.data[typ][name]
+        self.clear_caches()
+        self.data['references'].pop(docname, None)
+        for typ, name in self.data['docnames'].pop(docname, ()):
+            entry = self.data[typ].get(name)
+            # The name may have been claimed by a duplicate in another
+            # document since; only remove it if it is still ours.
+            if entry is not None and entry.docname == docname:
+                del self.data[typ][name]
+                if typ == 'method' and \
+                        self.data['routes'].get(entry.route) == name:
+                    del self.data['routes'][entry.route]
+
+    def merge_domaindata(self, docnames, otherdata):
+        """
+        Merge in data regarding *docnames* from a different domaindata
+        inventory (coming from a subprocess in parallel builds).
+
+        The subprocess already warned about duplicates among *docnames*
+        and the documents not read in this build, so only duplicates in
+        documents read by other subprocesses are warned about here.
+        """
+        self.clear_caches()
+        index = self.data['docnames']
+        for typ in self.object_types:
+            data = self.data[typ]
+            for name, entry in otherdata[typ].iteritems():
+                docname = entry.docname
+                if docname not in docnames:
+                    continue
+                if name in data and self.read_elsewhere(data[name],
+                                                        docnames):
+                    otherdocname = data[name].docname
+                    self.env.warn(
+                        docname,
+                        'duplicate %s description of %s, ' % (typ, entry.sig) +
+                        'other instance in ' +
+                        self.env.doc2path(otherdocname) +
+                        ', use :noindex: for one of them',
+                        entry.line
+                    )
+                if typ == 'method':
+                    self.merge_route(docnames, name, entry)
+                data[name] = entry
+                index.setdefault(docname, set()).add((typ, name))
+        for docname in docnames:
+            if docname in otherdata['references']:
+                self.data['references'][docname] = \
+                    otherdata['references'][docname]
+
+    def merge_route(self, docnames, name, entry):
+        """
+        Adds the route key of the method *entry* merged in from another
+        process, warning like :meth:`HTTPMethod.note_entry` if an
+        equivalent route was described under another name in a document
+        read by another process.
+        """
+        routes = self.data['routes']
+        other = routes.get(entry.route)
+        if other is not None and other != name and \
+                other in self.data['method']:
+            otherentry = self.data['method'][other]
+            if self.read_elsewhere(otherentry, docnames):
+                self.env.warn(
+                    entry.docname,
+                    'duplicate method description of %s, ' % entry.sig +
+                    'equivalent to %s in ' % otherentry.sig +
+                    self.env.doc2path(otherentry.docname) +
+                    ', use :noindex: for one of them',
+                    entry.line
+                )
+        routes[entry.route] = name
+
+    def read_elsewhere(self, entry, docnames):
+        """
+        Returns whether *entry* is described in a document read in this
+        build, but not among the *docnames* merged in from a subprocess.
+        """
+        return entry.docname in self._read_docnames and \
+            entry.docname not in docnames
+
+    def get_targets(self, docnames):
+        """
+        Returns a dict mapping (type, name) of the targets described in
+        *docnames* to their entries.
+        """
+        targets = {}
+        for docname in docnames:
+            for typ, name in self.data['docnames'].get(docname, ()):
+                entry = self.data[typ].get(name)
+                if entry is not None:
+                    targets[(typ, name)] = entry
+        return targets
+
+    def note_outdated(self, docnames):
+        """
+        Remembers the targets described in *docnames*, which are about to
+        be re-read or removed, for :meth:`get_stale_referrers`.
+        """
+        self._outdated_docnames = set(docnames)
+        self._outdated_targets = self.get_targets(docnames)
+
+    def note_read(self, docnames):
+        """
+        Remembers the documents about to be read in this build, and the
+        targets of those other ``env-get-outdated`` handlers added.
+        """
+        self._read_docnames = set(docnames)
+        if self._outdated_targets is not None:
+            added = self._read_docnames - self._outdated_docnames
+            self._outdated_targets.update(self.get_targets(added))
+            self._outdated_docnames |= added
+
+    def get_stale_referrers(self):
+        """
+        Returns the documents not re-read that refer to targets which
+        were added, removed or changed by re-reading documents.
+        """
+        if self._outdated_targets is None:
+            return set()
+        docnames = self._outdated_docnames
+        before = self._outdated_targets
+        after = self.get_targets(docnames)
+        self._outdated_targets = None
+        changed = set(key for key in set(before) | set(after)
+                      if target_state(before.get(key)) !=
+                      target_state(after.get(key)))
+        if not changed:
+            return set()
+        # Methods that were removed or changed, which references resolved
+        # through the route index may have been resolved to
+        previous = RouteTrie.from_entries(dict(
+            (name, before[(typ, name)]) for typ, name in changed
+            if typ == 'method' and (typ, name) in before
+        ))
+        referrers = set()
+        for docname, references in self.data['references'].iteritems():
+            if docname in docnames:
+                continue
+            for typ, target in references:
+                if (typ, target) in changed:
+                    referrers.add(docname)
+                    break
+                if target in self.data[typ]:
+                    continue
+                # Resolved through the route index, through inventories,
+                # or not at all
+                match = self.find_xref(self.env, typ, target)
+                if match is not None and (typ, match[0]) in changed or \
+                        typ == 'method' and \
+                        previous.match_signature(target) is not None:
+                    referrers.add(docname)
+                    break
+        return referrers
 
     def find_xref(self, env, typ, target):
-        """Returns a self.data entry for *target*, according to *typ*."""
+        """
+        Returns a (name, self.data entry) pair for *target*, according to
+        *typ*, or None.
+
+        Methods may also be referred to by a signature, whose path
+        arguments are matched regardless of their names, like
+        ``GET /users/{user_id}``, or by a concrete signature, like
+        ``GET /users/42``, which is matched against the documented routes.
+        """
         try:
-            return self.data[typ][target]
+            return (target, self.data[typ][target])
         except KeyError:
-            return None
+            pass
+        if typ == 'method':
+            name = self.data['routes'].get(parse_route_key(target))
+            if name is not None and name in self.data[typ]:
+                return (name, self.data[typ][name])
+            name = self.routes.match_signature(target)
+            if name is not None:
+                return (name, self.data[typ][name])
+        return None
 
+    @profiled('HTTPDomain.resolve_xref', sig_arg=4, docname_arg=1)
     def resolve_xref(self, env, fromdocname, builder,
                      typ, target, node, contnode):
         """
@@ -67,13 +300,48 @@ class HTTPDomain(Domain):
 
         Returns a new reference node, to replace the xref node.
 
-        If no resolution can be found, returns None.
+        Targets not documented in this project are looked up in the
+        ``http_inventories`` of other projects.
+
+        If no resolution can be found, warns about close matches, if any,
+        and returns None.
+        """
+        refnode = self.make_xref(env, fromdocname, builder,
+                                 typ, target, node, contnode)
+        if refnode is None:
+            refnode = self.make_inventory_xref(typ, target, contnode)
+        if refnode is None and env.config.http_suggest_references:
+            suggestions = self.suggest_xref(typ, target)
+            if suggestions:
+                env.warn(fromdocname,
+                         'unresolved %s:%s reference %r, did you mean %s?' %
+                         (self.name, typ, target,
+                          ' or '.join(repr(s) for s in suggestions)),
+                         node.line)
+        return refnode
+
+    def suggest_xref(self, typ, target):
+        """Returns the names of *typ* closest to an unresolved *target*."""
+        index = self._suggestions.get(typ)
+        if index is None:
+            index = self._suggestions[typ] = NGramIndex(self.data[typ])
+        if typ == 'method' and ' ' in target.strip():
+            # A signature rather than a name
+            target = slugify_url(target.replace(' ', '-', 1))
+        return index.suggest(target)
+
+    def make_xref(self, env, fromdocname, builder,
+                  typ, target, node, contnode):
+        """
+        Returns a new reference node for *target*, or None if it cannot be
+        resolved.
         """
         match = self.find_xref(env, typ, target)
         if match:
-            docname = match[0]
-            sig = match[1]
-            title = match[2]
+            name, entry = match
+            docname = entry.docname
+            sig = entry.sig
+            title = entry.title
             # Coerce contnode into the right nodetype
             nodetype = type(contnode)
             if issubclass(nodetype, literal):
@@ -86,8 +354,88 @@ class HTTPDomain(Domain):
                 child = contnode.children[0]
                 contnode = nodetype(child, child)
             # Return the new reference node
-            return make_refnode(builder, fromdocname, docname,
-                                typ + '-' + target, contnode, sig)
+            return self.make_refnode(builder, fromdocname, docname,
+                                     entry.anchor, contnode, sig)
+
+    def make_inventory_xref(self, typ, target, contnode):
+        """
+        Returns a new reference node for *target* documented in another
+        project, or None if it is not found in ``http_inventories``.
+        """
+        found = inventories.lookup(typ, target)
+        if found is None:
+            return None
+        uri, title = found
+        nodetype = type(contnode)
+        if issubclass(nodetype, literal):
+            nodetype = self.directives[typ].nodetype
+        if contnode.astext() == target:
+            contnode = nodetype(title, title)
+        else:
+            child = contnode.children[0]
+            contnode = nodetype(child, child)
+        node = reference('', '', internal=False, refuri=uri, reftitle=title)
+        node.append(contnode)
+        return node
+
+    @property
+    def any_index(self):
+        """
+        A dict mapping names of all object types to lists of their
+        (type, entry) pairs.
+        """
+        if self._any_index is None:
+            index = {}
+            for typ in sorted(self.object_types):
+                for name, entry in self.data[typ].iteritems():
+                    index.setdefault(name, []).append((typ, entry))
+            self._any_index = index
+        return self._any_index
+
+    def resolve_any_xref(self, env, fromdocname, builder, target, node,
+                         contnode):
+        """
+        Resolve the ``pending_xref`` *node* of an ``:any:`` role.
+
+        Returns a list of (role name, reference node) pairs, one for each
+        object type *target* resolves to.
+        """
+        types = [typ for typ, entry in self.any_index.get(target, ())]
+        if not types:
+            # Concrete method signatures are matched against the routes
+            types = ['method']
+        results = []
+        for typ in types:
+            refnode = self.make_xref(env, fromdocname, builder, typ,
+                                     target, node, contnode)
+            if refnode is not None:
+                results.append((self.name + ':' + self.role_for_objtype(typ),
+                                refnode))
+        return results
+
+    def make_refnode(self, builder, fromdocname, todocname, targetid,
+                     child, title=None):
+        """
+        Like :func:`sphinx.util.nodes.make_refnode`, but with relative
+        URIs between documents cached for the current builder.
+        """
+        node = reference('', '', internal=True)
+        if fromdocname == todocname:
+            node['refid'] = targetid
+        else:
+            if builder is not self._uris_builder:
+                self._uris_builder = builder
+                self._uris = {}
+            key = (fromdocname, todocname)
+            uri = self._uris.get(key)
+            if uri is None:
+                uri = self._uris[key] = builder.get_relative_uri(fromdocname,
+                                                                 todocname)
+            node['refuri'] = uri + '#' + targetid
+        if title:
+            node['reftitle'] = title
+        node.append(child)
+        return node
 
     def get_objects(self):
         """
@@ -107,20 +455,183 @@ class HTTPDomain(Domain):
           - 2: object is unimportant (placed after full-text matches)
           - -1: object should not show up in search at all
         """
-        # Method descriptions
-        for typ in self.initial_data:
+        # Methods are displayed by their signature, which other projects
+        # read back from the inventory to look them up by route key.
+        # With their own search index, they are left out of Sphinx's.
+        method_priority = 0
+        if self.env.config.http_search_index:
+            method_priority = -1
+        for typ in self.object_types:
             for name, entry in self.data[typ].iteritems():
-                docname = entry[0]
-                yield(name, name, typ, docname, typ + '-' + name, 0)
+                docname = entry.docname
+                if typ == 'method':
+                    yield(name, entry.sig, typ, docname, entry.anchor,
+                          method_priority)
+                else:
+                    yield(name, name, typ, docname, entry.anchor, 0)
+
+
+def target_state(entry):
+    """
+    Returns what documents referring to the target of *entry* show of
+    it, or None.
+    """
+    if entry is not None:
+        return (entry.docname, entry.sig, entry.title, entry.anchor)
+
+
+def signature_cache_file(app):
+    """Returns the file the signature cache is persisted in."""
+    return path.join(app.doctreedir, 'http_signatures.pickle')
+
+
+def load_signature_cache(app):
+    if app.config.http_signature_cache:
+        signature_cache.load(signature_cache_file(app))
+
+
+def save_signature_cache(app, exception):
+    if exception is None and app.config.http_signature_cache:
+        signature_cache.save(signature_cache_file(app))
+
+
+# Persistent caches by name, with the config value keeping them
+persistent_caches = (
+    ('signatures', signature_cache, 'http_signature_cache'),
+    ('route_tables', route_table_cache, 'http_route_cache'),
+    ('app_routes', app_route_cache, 'http_route_cache'),
+)
+
+
+def note_cache_additions(app, doctree):
+    """
+    Puts the items a parallel reader added to the kept persistent caches
+    on its environment, which is sent back to the main process, on
+    ``doctree-read``.
+    """
+    additions = {}
+    for name, cache, confval in persistent_caches:
+        if cache.added and getattr(app.config, confval):
+            additions[name] = cache.added
+    if additions:
+        app.env.http_cache_additions = additions
+
+
+def merge_cache_additions(app, env, docnames, other):
+    """Adds the cache items of a parallel reader, on ``env-merge-info``."""
+    additions = other.__dict__.pop('http_cache_additions', {})
+    for name, cache, confval in persistent_caches:
+        cache.merge(additions.get(name, {}))
+
+
+def route_table_cache_file(app):
+    """Returns the file the route table cache is persisted in."""
+    return path.join(app.doctreedir, 'http_routes.pickle')
+
+
+def app_route_cache_file(app):
+    """Returns the file the routes of WSGI applications are kept in."""
+    return path.join(app.doctreedir, 'http_autoroutes.pickle')
+
+
+def load_route_table_cache(app):
+    if app.config.http_route_cache:
+        route_table_cache.load(route_table_cache_file(app))
+        app_route_cache.load(app_route_cache_file(app))
+
+
+def save_route_table_cache(app, exception):
+    if exception is None and app.config.http_route_cache:
+        route_table_cache.save(route_table_cache_file(app))
+        app_route_cache.save(app_route_cache_file(app))
+
+
+def add_index_label(app):
+    """
+    Lets ``:ref:`http-endpoints``` link to the endpoint index, like
+    Sphinx's own ``modindex`` label.
+    """
+    name = '%s-%s' % (HTTPDomain.name, HTTPIndex.name)
+    std = app.env.domaindata['std']
+    std['labels'][name] = (name, '', HTTPIndex.localname)
+    std['anonlabels'][name] = (name, '')
+
+
+def load_inventories(app):
+    if app.config.http_inventories:
+        inventories.load(app.config.http_inventories, app.srcdir,
+                         app.doctreedir, app.warn)
+
+
+def note_outdated(app, env, added, changed, removed):
+    env.domains[HTTPDomain.name].note_outdated(added | changed | removed)
+    return []
+
+
+def note_read(app, env, docnames):
+    env.domains[HTTPDomain.name].note_read(docnames)
+
+
+def get_stale_referrers(app, env):
+    return env.domains[HTTPDomain.name].get_stale_referrers()
+
+
+http_nodes = (desc_http_method, desc_http_url, desc_http_path,
+              desc_http_patharg, desc_http_query, desc_http_queryparam,
+              desc_http_fragment, desc_http_response)
+
+
+def profile_visitors(app):
+    """
+    Registers timed visitors for the HTTP nodes while profiling, on
+    ``builder-inited``.
+    """
+    if app.config.http_profile:
+        for node in http_nodes:
+            node.contribute_to_app(app, wrap=profiled_visitor)
 
 
 def setup(app):
     app.add_domain(HTTPDomain)
-    desc_http_method.contribute_to_app(app)
-    desc_http_url.contribute_to_app(app)
-    desc_http_path.contribute_to_app(app)
-    desc_http_patharg.contribute_to_app(app)
-    desc_http_query.contribute_to_app(app)
-    desc_http_queryparam.contribute_to_app(app)
-    desc_http_fragment.contribute_to_app(app)
-    desc_http_response.contribute_to_app(app)
+    app.add_builder(HTTPEndpointsBuilder)
+    app.add_builder(HTTPCheckBuilder)
+    app.add_config_value('http_signature_cache', False, '')
+    app.add_config_value('http_route_cache', True, '')
+    app.add_config_value('http_compact_urls', False, 'env')
+    app.add_config_value('http_profile', False, '')
+    app.add_config_value('http_profile_limit', 20, '')
+    app.add_config_value('http_endpoints_format', 'jsonl', '')
+    app.add_config_value('http_suggest_references', True, '')
+    app.add_config_value('http_inventories', {}, '')
+    app.add_config_value('http_search_index', False, 'html')
+    app.add_config_value('http_anchor_style', 'slug', 'env')
+    app.add_config_value('http_anchor_aliases', True, 'env')
+    app.add_config_value('http_check_base_url', 'http://localhost:8000', '')
+    app.add_config_value('http_check_samples', {}, '')
+    app.add_config_value('http_check_methods', ('GET', 'HEAD'), '')
+    app.add_config_value('http_check_workers', 4, '')
+    app.add_config_value('http_check_rate', 0, '')
+    app.add_config_value('http_check_timeout', 10, '')
+    app.connect('builder-inited', load_signature_cache)
+    app.connect('builder-inited', init_profile)
+    app.connect('builder-inited', profile_visitors)
+    app.connect('builder-inited', add_index_label)
+    app.connect('builder-inited', load_inventories)
+    app.connect('builder-inited', load_route_table_cache)
+    app.connect('builder-inited', add_static_path)
+    app.connect('env-get-outdated', note_outdated)
+    app.connect('env-before-read-docs', note_read)
+    app.connect('env-merge-info', merge_profile)
+    app.connect('env-merge-info', merge_cache_additions)
+    app.connect('doctree-read', note_cache_additions)
+    app.connect('env-updated', get_stale_referrers)
+    app.connect('build-finished', save_signature_cache)
+    app.connect('build-finished', save_route_table_cache)
+    app.connect('build-finished', write_profile)
+    app.connect('build-finished', write_search_index)
+    for node in http_nodes:
+        node.contribute_to_app(app)
+    return {
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
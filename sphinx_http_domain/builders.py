@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.domains.http
+    ~~~~~~~~~~~~~~~~~~~
+
+    Builders for the HTTP domain.
+"""
+
+from __future__ import with_statement
+
+import codecs
+import json
+from os import path
+
+from sphinx.builders import Builder
+
+from sphinx_http_domain.checker import EndpointChecker
+from sphinx_http_domain.docfields import ResponseField
+from sphinx_http_domain.signatures import signature_cache
+
+
+def iter_endpoints(domain):
+    """
+    Yields a dict describing each method documented in *domain*, sorted
+    by signature.
+    """
+    entries = sorted(domain.data['method'].iteritems(),
+                     key=lambda item: (item[1].sig, item[0]))
+    for name, entry in entries:
+        parsed = signature_cache.parse(entry.sig)
+        if parsed is None:
+            continue
+        yield {
+            'name': name,
+            'method': entry.method,
+            'url': parsed.url,
+            'path': parsed.path,
+            'title': entry.title,
+            'docname': entry.docname,
+            'anchor': entry.anchor,
+            'path_args': [arg for _, arg in parsed.segments
+                          if arg is not None],
+            'query_params': [p.split('=', 1)[0] for p in parsed.params],
+            'fragment': parsed.fragment or None,
+            'responses': list(entry.responses),
+        }
+
+
+def openapi_skeleton(endpoints, title, version):
+    """
+    Returns a minimal OpenAPI document for *endpoints*.
+
+    Methods whose signatures only differ in their query string, like
+    ``GET /users`` and ``GET /users?active``, are a single operation in
+    OpenAPI, which takes the query parameters of all of them.
+    """
+    operations = {}
+    for endpoint in endpoints:
+        key = (endpoint['path'], endpoint['method'].lower())
+        operations.setdefault(key, []).append(endpoint)
+    paths = {}
+    for (urlpath, method), group in operations.iteritems():
+        parameters = []
+        for arg in group[0]['path_args']:
+            parameters.append({'name': arg, 'in': 'path', 'required': True,
+                               'schema': {'type': 'string'}})
+        params = []
+        responses = {}
+        for endpoint in group:
+            for param in endpoint['query_params']:
+                if param not in params:
+                    params.append(param)
+            for code in endpoint['responses']:
+                description = ResponseField.status_codes.get(code, '')
+                responses[code] = {'description': description}
+        for param in params:
+            parameters.append({'name': param, 'in': 'query',
+                               'schema': {'type': 'string'}})
+        if not responses:
+            responses['default'] = {'description': ''}
+        paths.setdefault(urlpath, {})[method] = {
+            'operationId': group[0]['name'],
+            'summary': group[0]['title'],
+            'parameters': parameters,
+            'responses': responses,
+        }
+    return {
+        'openapi': '3.0.0',
+        'info': {'title': title, 'version': version},
+        'paths': paths,
+    }
+
+
+class HTTPEndpointsBuilder(Builder):
+    """
+    Writes the documented HTTP methods as JSON Lines or as a minimal
+    OpenAPI skeleton, without rendering any documents.
+    """
+    name = 'httpendpoints'
+
+    def init(self):
+        pass
+
+    def get_outdated_docs(self):
+        return 'endpoint catalogue'
+
+    def get_target_uri(self, docname, typ=None):
+        return ''
+
+    def prepare_writing(self, docnames):
+        pass
+
+    def write_doc(self, docname, doctree):
+        pass
+
+    def write(self, *ignored):
+        domain = self.env.domains['http']
+        endpoints = iter_endpoints(domain)
+        format = self.config.http_endpoints_format
+        if format == 'jsonl':
+            filename = path.join(self.outdir, 'endpoints.jsonl')
+            with codecs.open(filename, 'w', 'utf-8') as f:
+                for endpoint in endpoints:
+                    f.write(json.dumps(endpoint, sort_keys=True) + '\n')
+        elif format == 'openapi':
+            filename = path.join(self.outdir, 'openapi.json')
+            document = openapi_skeleton(endpoints, self.config.project,
+                                        self.config.version)
+            with codecs.open(filename, 'w', 'utf-8') as f:
+                f.write(json.dumps(document, indent=2, sort_keys=True))
+        else:
+            self.warn('unknown http_endpoints_format %r, expected '
+                      '"jsonl" or "openapi"' % format)
+            return
+        self.info('endpoints written to %s' % filename)
+
+    def finish(self):
+        pass
+
+
+class HTTPCheckBuilder(Builder):
+    """
+    Requests every documented HTTP method from a running server, and
+    reports the status codes received against the documented responses.
+    """
+    name = 'httpcheck'
+
+    def init(self):
+        config = self.config
+        self.checker = EndpointChecker(config.http_check_base_url,
+                                       config.http_check_samples,
+                                       config.http_check_methods,
+                                       config.http_check_workers,
+                                       config.http_check_rate,
+                                       config.http_check_timeout)
+
+    def get_outdated_docs(self):
+        return 'endpoint check'
+
+    def get_target_uri(self, docname, typ=None):
+        return ''
+
+    def prepare_writing(self, docnames):
+        pass
+
+    def write_doc(self, docname, doctree):
+        pass
+
+    def write(self, *ignored):
+        domain = self.env.domains['http']
+        entries = sorted(domain.data['method'].iteritems(),
+                         key=lambda item: (item[1].sig, item[0]))
+        results = []
+        for result in self.checker.check(entries):
+            results.append(result)
+            entry = result.entry
+            location = '%s: %s' % (entry.docname, entry.sig)
+            if result.state == 'ok':
+                self.info('%s -> %s' % (location, result.status))
+            elif result.state == 'skipped':
+                self.info('%s: skipped, %s' % (location, result.info))
+            else:
+                status = result.status or 'no response'
+                self.warn('%s: %s %s (%s)' % (location, result.state,
+                                              status, result.info))
+                self.app.statuscode = 1
+        results.sort(key=lambda result: (result.entry.sig, result.name))
+        filename = path.join(self.outdir, 'httpcheck.txt')
+        with codecs.open(filename, 'w', 'utf-8') as f:
+            for result in results:
+                f.write('%s: [%s] %s %s %s %s\n' % (
+                    self.env.doc2path(result.entry.docname, None),
+                    result.state, result.entry.sig, result.url or '-',
+                    result.status or '-', result.info))
+        self.info('check results written to %s' % filename)
+
+    def finish(self):
+        pass
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.domains.http
+    ~~~~~~~~~~~~~~~~~~~
+
+    Checking documented HTTP methods against a running server.
+"""
+
+from __future__ import with_statement
+
+import httplib
+import socket
+import threading
+import time
+import urllib
+from collections import namedtuple
+from Queue import Queue
+from urlparse import urlsplit
+
+from sphinx_http_domain.signatures import signature_cache
+
+
+class CheckResult(namedtuple('CheckResult',
+                             'name entry url status state info')):
+    """
+    The outcome of checking one method.
+
+    * `name`   -- the name of the method
+    * `entry`  -- its :class:`~sphinx_http_domain.records.MethodEntry`
+    * `url`    -- the URL requested, or None if it was not requested
+    * `status` -- the status code received, or None
+    * `state`  -- ``ok``, ``undocumented``, ``broken`` or ``skipped``
+    * `info`   -- a description of the outcome
+    """
+    __slots__ = ()
+
+
+class RateLimiter(object):
+    """Spaces out calls to :meth:`wait` to at most *rate* per second."""
+    def __init__(self, rate):
+        self.interval = rate and 1.0 / rate or 0
+        self.lock = threading.Lock()
+        self.next = 0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.time()
+            delay = self.next - now
+            self.next = max(now, self.next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class EndpointChecker(object):
+    """
+    Requests the documented methods from a server at *base_url*, with a
+    pool of *workers* threads, each keeping its connection alive.
+
+    Path arguments are filled in from *samples*, a dict of argument names
+    to values; methods with other arguments are skipped, as are methods
+    not in *methods*.  The status codes received are compared with the
+    documented responses of each method.
+    """
+    def __init__(self, base_url, samples=None, methods=('GET', 'HEAD'),
+                 workers=4, rate=0, timeout=10):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError('unsupported base URL %r' % base_url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.base_path = parts.path.rstrip('/')
+        self.samples = samples or {}
+        self.methods = set(method.upper() for method in methods)
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.timeout = timeout
+
+    def request_path(self, entry):
+        """
+        Returns the path to request for *entry*, or raises KeyError with
+        the name of an argument without a sample value.
+        """
+        parsed = signature_cache.parse(entry.sig)
+        parts = [self.base_path]
+        for text, arg in parsed.segments:
+            parts.append(text)
+            if arg is not None:
+                parts.append(urllib.quote(unicode(self.samples[arg])
+                                          .encode('utf-8'), safe=''))
+        path = ''.join(parts)
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+        return path or '/'
+
+    def check(self, entries):
+        """
+        Checks the (name, entry) pairs of *entries*, yielding a
+        :class:`CheckResult` for each as they complete.
+        """
+        todo = Queue()
+        done = Queue()
+        count = 0
+        for name, entry in entries:
+            todo.put((name, entry))
+            count += 1
+        threads = []
+        for i in xrange(min(self.workers, count)):
+            todo.put(None)
+            thread = threading.Thread(target=self.work, args=(todo, done))
+            thread.setDaemon(True)
+            thread.start()
+            threads.append(thread)
+        for i in xrange(count):
+            yield done.get()
+        for thread in threads:
+            thread.join()
+
+    def work(self, todo, done):
+        connection = None
+        while True:
+            item = todo.get()
+            if item is None:
+                break
+            name, entry = item
+            try:
+                result, connection = self.check_entry(name, entry,
+                                                      connection)
+            except Exception, err:
+                result = CheckResult(name, entry, None, None, 'broken',
+                                     str(err))
+            done.put(result)
+        if connection is not None:
+            connection.close()
+
+    def connect(self):
+        if self.scheme == 'https':
+            return httplib.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return httplib.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def check_entry(self, name, entry, connection):
+        """
+        Returns the :class:`CheckResult` for *entry*, and the connection
+        to use for the next request.
+        """
+        method = entry.method.upper()
+        if method not in self.methods:
+            return (CheckResult(name, entry, None, None, 'skipped',
+                                'method %s is not checked' % method),
+                    connection)
+        try:
+            path = self.request_path(entry)
+        except KeyError, err:
+            return (CheckResult(name, entry, None, None, 'skipped',
+                                'no sample value for {%s}' % err.args[0]),
+                    connection)
+        url = '%s://%s%s' % (self.scheme, self.netloc, path)
+        self.limiter.wait()
+        # Retry once on a fresh connection if a kept-alive one was closed
+        for attempt in (0, 1):
+            if connection is None:
+                connection = self.connect()
+            try:
+                connection.request(method, path)
+                response = connection.getresponse()
+                response.read()
+                break
+            except (httplib.HTTPException, socket.error), err:
+                connection.close()
+                connection = None
+                if attempt:
+                    return (CheckResult(name, entry, url, None, 'broken',
+                                        str(err) or err.__class__.__name__),
+                            connection)
+        if response.getheader('connection', '').lower() == 'close':
+            connection.close()
+            connection = None
+        status = str(response.status)
+        return (self.compare(name, entry, url, status), connection)
+
+    def compare(self, name, entry, url, status):
+        """Returns the :class:`CheckResult` for a received *status*."""
+        if entry.responses:
+            if status in entry.responses:
+                return CheckResult(name, entry, url, status, 'ok', '')
+            return CheckResult(name, entry, url, status, 'undocumented',
+                               'documented: %s' % ', '.join(entry.responses))
+        if status[0] in '23':
+            return CheckResult(name, entry, url, status, 'ok', '')
+        return CheckResult(name, entry, url, status, 'broken',
+                           'no responses documented')
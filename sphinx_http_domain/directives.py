@@ -6,11 +6,11 @@
     Directives for the HTTP domain.
 """
 
-import re
-from urlparse import urlsplit
+from os import path
 
-from docutils.nodes import literal, strong, Text
-from docutils.parsers.rst import directives
+from docutils.nodes import field_list, literal, strong, Text
+from docutils.parsers.rst import Directive, directives
+from docutils.statemachine import ViewList
 
 from sphinx.locale import l_, _
 from sphinx.directives import ObjectDescription
@@ -21,7 +21,14 @@ from sphinx_http_domain.nodes import (desc_http_method, desc_http_url,
                                       desc_http_path, desc_http_patharg,
                                       desc_http_query, desc_http_queryparam,
                                       desc_http_fragment, desc_http_response)
-from sphinx_http_domain.utils import slugify, slugify_url
+from sphinx_http_domain.profiling import profiled
+from sphinx_http_domain.records import MethodEntry, ResponseEntry
+from sphinx_http_domain.routetables import (RouteTableError,
+                                            route_table_cache)
+from sphinx_http_domain.wsgi import AppError, app_route_cache
+from sphinx_http_domain.signatures import (route_key, signature_cache,
+                                           split_path, tokenize_url)
+from sphinx_http_domain.utils import hashed_anchor, slugify, slugify_url
 
 try:
     from urlparse import parse_qsl
@@ -53,6 +60,7 @@ class HTTPDescription(ObjectDescription):
         """
         return name
 
+    @profiled('HTTPDescription.add_target_and_index', sig_arg=1)
     def add_target_and_index(self, name, sig, signode):
         """
         Add cross-reference IDs and entries to self.indexnode, if applicable.
@@ -61,20 +69,38 @@ class HTTPDescription(ObjectDescription):
         """
         anchor = self.get_anchor(name, sig)
         id = self.get_id(name, sig)
-        self.add_target(anchor=anchor, entry=self.get_entry(name, sig),
-                        id=id, sig=sig, signode=signode)
+        entry = self.get_entry(name, sig)
+        entry.anchor = anchor
+        entry.line = self.lineno
+        self.add_target(anchor=anchor, entry=entry,
+                        id=id, sig=sig, signode=signode,
+                        aliases=self.get_aliases(name, sig))
         self.add_index(anchor=anchor, name=name, sig=sig)
 
-    def add_target(self, anchor, id, entry, sig, signode):
+    def get_aliases(self, name, sig):
+        """
+        Returns other anchors the target should be reachable by.
+
+        *name* is whatever :meth:`handle_signature()` returned.
+        """
+        return ()
+
+    def add_target(self, anchor, id, entry, sig, signode, aliases=()):
         """Add cross-references to self.env.domaindata, if applicable."""
         if anchor not in self.state.document.ids:
             signode['names'].append(anchor)
             signode['ids'].append(anchor)
             signode['first'] = (not self.names)
             self.state.document.note_explicit_target(signode)
-            data = self.env.domaindata['http'][self.typ]
+            # Aliases only get an ID, so old links to them keep working
+            for alias in aliases:
+                if alias != anchor and alias not in self.state.document.ids:
+                    signode['ids'].append(alias)
+                    self.state.document.ids[alias] = signode
+            domaindata = self.env.domaindata['http']
+            data = domaindata[self.typ]
             if id in data:
-                otherdocname = data[id][0]
+                otherdocname = data[id].docname
                 self.env.warn(
                     self.env.docname,
                     'duplicate method description of %s, ' % sig +
@@ -84,6 +110,24 @@ class HTTPDescription(ObjectDescription):
                     self.lineno
                 )
             data[id] = entry
+            domaindata['docnames'].setdefault(self.env.docname,
+                                              set()).add((self.typ, id))
+            self.note_entry(domaindata, id, entry, sig)
+        else:
+            self.env.warn(
+                self.env.docname,
+                'duplicate %s description of %s, ' % (self.typ, sig) +
+                'its anchor %s is already used in this document' % anchor +
+                ', use :noindex: for one of them',
+                self.lineno
+            )
+
+    def note_entry(self, domaindata, id, entry, sig):
+        """
+        Add secondary indexes for *entry* to self.env.domaindata, if
+        applicable.
+        """
+        pass
 
     def add_index(self, anchor, name, sig):
         """
@@ -130,27 +174,6 @@ class HTTPMethod(HTTPDescription):
                       can_collapse=True)
     ]
 
-    # RE for HTTP method signatures
-    sig_re = re.compile(
-        (
-            r'^'
-            r'(?:(GET|POST|PUT|DELETE)\s+)?'  # HTTP method
-            r'(.+)'                           # URL
-            r'\s*$'
-        ),
-        re.IGNORECASE
-    )
-
-    # Note, path_re.findall() will produce an extra ('', '') tuple
-    # at the end of its matches. You should strip it off, or you will
-    path_re = re.compile(
-        (
-            r'([^{]*)'                  # Plain text
-            r'(\{[^}]*\})?'             # {arg} in matched braces
-        ),
-        re.VERBOSE
-    )
-
     def node_from_method(self, method):
         """Returns a ``desc_http_method`` Node from a ``method`` string."""
         if method is None:
@@ -163,7 +186,7 @@ class HTTPMethod(HTTPDescription):
             raise ValueError
         # Split URL into path, query, and fragment
         path, query, fragment = self.split_url(url)
-        urlnode = desc_http_url()
+        urlnode = desc_http_url(url)
         urlnode += self.node_from_path(path)
         node = self.node_from_query(query)
         if node:
@@ -173,26 +196,58 @@ class HTTPMethod(HTTPDescription):
             urlnode += node
         return urlnode
 
-    def node_from_path(self, path):
-        """Returns a ``desc_http_path`` Node from a ``path`` string."""
+    def node_from_parsed(self, parsed):
+        """
+        Returns a ``desc_http_url`` Node from a :class:`ParsedSignature`.
+
+        With ``http_compact_urls``, the node only keeps the URL as text,
+        instead of a subtree of nodes.
+        """
+        if self.env.config.http_compact_urls:
+            if not parsed.path:
+                raise ValueError
+            return desc_http_url.compact(parsed.url)
+        urlnode = desc_http_url(parsed.url)
+        urlnode += self.node_from_path(parsed.path, parsed.segments)
+        node = self.node_from_query(parsed.query, parsed.params)
+        if node:
+            urlnode += node
+        node = self.node_from_fragment(parsed.fragment)
+        if node:
+            urlnode += node
+        return urlnode
+
+    def node_from_path(self, path, segments=None):
+        """
+        Returns a ``desc_http_path`` Node from a ``path`` string.
+
+        *segments* are the (text, arg) pairs of the path, if they are
+        already known.
+        """
         if path:
             pathnode = desc_http_path(path)
-            path_segments = self.path_re.findall(path)[:-1]
-            for text, arg in path_segments:
+            if segments is None:
+                segments = split_path(path)
+            for text, arg in segments:
                 pathnode += Text(text)
-                if arg:
-                    arg = arg[1:-1]     # Strip off { and }
+                if arg is not None:
                     pathnode += desc_http_patharg(arg, arg)
             return pathnode
         else:
             raise ValueError
 
-    def node_from_query(self, query):
-        """Returns a ``desc_http_query`` Node from a ``query`` string."""
+    def node_from_query(self, query, params=None):
+        """
+        Returns a ``desc_http_query`` Node from a ``query`` string.
+
+        *params* are the parameters of the query string, if they are
+        already known.
+        """
         if query:
             querynode = desc_http_query(query)
-            query_params = query.split('&')
-            for p in query_params:
+            if params is None:
+                params = query.split('&')
+            for p in params:
                 querynode += desc_http_queryparam(p, p)
             return querynode
 
@@ -206,22 +261,23 @@ class HTTPMethod(HTTPDescription):
         Splits a ``url`` string into its components.
         Returns (path, query string, fragment).
         """
-        _, _, path, query, fragment = urlsplit(url)
+        path, _, query, fragment = tokenize_url(url)
         return (path, query, fragment)
 
+    @profiled('HTTPMethod.handle_signature', sig_arg=0)
     def handle_signature(self, sig, signode):
         """
         Transform an HTTP method signature into RST nodes.
         Returns (method name, full URL).
         """
-        # Match the signature to extract the method and URL
-        m = self.sig_re.match(sig)
-        if m is None:
+        # Parse the signature to extract the method and URL
+        parsed = signature_cache.parse(sig)
+        if parsed is None:
             raise ValueError
-        method, url = m.groups()
+        method, url = (parsed.method or 'GET'), parsed.url
         # Append nodes to signode for method and url
         signode += self.node_from_method(method)
-        signode += self.node_from_url(url)
+        signode += self.node_from_parsed(parsed)
         # Name and title
         name = self.options.get('label-name',
                                 slugify_url(method.lower() + '-' + url))
@@ -235,7 +291,55 @@ class HTTPMethod(HTTPDescription):
         *name* is whatever :meth:`handle_signature()` returned.
         """
         method, _, _, title = name
-        return (self.env.docname, sig, title, method)
+        parsed = signature_cache.parse(sig)
+        entry = MethodEntry(self.env.docname, sig, title, method, (),
+                            route_key(method, parsed.segments, parsed.params))
+        # The responses are filled in once the content is parsed
+        self.entries.append(entry)
+        return entry
+
+    def note_entry(self, domaindata, id, entry, sig):
+        """
+        Add the route key of *entry* to self.env.domaindata, warning if an
+        equivalent path template was already described under another name.
+        """
+        routes = domaindata['routes']
+        other = routes.get(entry.route)
+        if other is not None and other != id and other in domaindata[self.typ]:
+            otherdocname = domaindata[self.typ][other].docname
+            self.env.warn(
+                self.env.docname,
+                'duplicate method description of %s, ' % sig +
+                'equivalent to %s in ' % domaindata[self.typ][other].sig +
+                self.env.doc2path(otherdocname) +
+                ', use :noindex: for one of them',
+                self.lineno
+            )
+        routes[entry.route] = id
+
+    def run(self):
+        self.entries = []
+        result = HTTPDescription.run(self)
+        responses = self.get_responses(result[-1][-1])
+        for entry in self.entries:
+            entry.responses = responses
+        return result
+
+    def get_responses(self, contentnode):
+        """
+        Returns a tuple of the status codes documented in the transformed
+        field lists of *contentnode*, by any ``ResponseField``.
+        """
+        codes = []
+        for child in contentnode:
+            if not isinstance(child, field_list):
+                continue
+            for field in child:
+                if 'responses' in field:
+                    codes.extend(field['responses'])
+                    # Collected, so keep it out of the doctree
+                    del field['responses']
+        return tuple(codes)
 
     def get_id(self, name, sig):
         """
@@ -245,6 +349,38 @@ class HTTPMethod(HTTPDescription):
         """
         return name[2]
 
+    def get_anchor(self, name, sig):
+        """
+        Returns anchor for cross-reference IDs.
+
+        With ``http_anchor_style = 'hash'``, this is a readable prefix and
+        a hash of the canonical route, query and fragment, instead of the
+        full slugified URL.
+
+        *name* is whatever :meth:`handle_signature()` returned.
+        """
+        if self.env.config.http_anchor_style != 'hash':
+            return super(HTTPMethod, self).get_anchor(name, sig)
+        method = name[0]
+        parsed = signature_cache.parse(sig)
+        first = parsed.path.strip('/').split('/', 1)[0]
+        key = route_key(method, parsed.segments, parsed.params)
+        if parsed.fragment:
+            key += '#' + parsed.fragment
+        return hashed_anchor('%s %s %s' % (self.typ, method, first), key)
+
+    def get_aliases(self, name, sig):
+        """
+        Returns the slugified anchor, if anchors are hashed and
+        ``http_anchor_aliases`` is set.
+
+        *name* is whatever :meth:`handle_signature()` returned.
+        """
+        if self.env.config.http_anchor_style == 'hash' and \
+                self.env.config.http_anchor_aliases:
+            return (super(HTTPMethod, self).get_anchor(name, sig),)
+        return ()
+
     def add_index(self, anchor, name, sig):
         """
         Add index entries to self.indexnode, if applicable.
@@ -285,6 +421,7 @@ class HTTPResponse(HTTPDescription):
                           can_collapse=True),
     ]
 
+    @profiled('HTTPResponse.handle_signature', sig_arg=0)
     def handle_signature(self, sig, signode):
         """
         Transform an HTTP response into RST nodes.
@@ -295,7 +432,7 @@ class HTTPResponse(HTTPDescription):
         return name
 
     def get_entry(self, name, sig):
-        return (self.env.docname, sig, sig)
+        return ResponseEntry(self.env.docname, sig, sig)
 
     def add_index(self, anchor, name, sig):
         """
@@ -309,3 +446,86 @@ class HTTPResponse(HTTPDescription):
         self.indexnode['entries'].append(('single',
                                           _("HTTP response; %s") % sig,
                                           anchor, anchor))
+
+
+class HTTPRoutes(Directive):
+    """
+    Describes the HTTP methods of a route table in a JSON, JSON Lines,
+    YAML or CSV file, as if each was described with ``http:method``.
+    """
+    required_arguments = 1
+    optional_arguments = 0
+    final_argument_whitespace = True
+    has_content = False
+
+    option_spec = {
+        'format': lambda arg: directives.choice(
+            arg, ('json', 'jsonl', 'yaml', 'csv')),
+        'noindex': directives.flag,
+    }
+
+    def run(self):
+        self.env = self.state.document.settings.env
+        try:
+            routes, source = self.get_routes()
+        except (IOError, RouteTableError, AppError), err:
+            return [self.state.document.reporter.warning(
+                'Cannot read routes of %s: %s' % (self.arguments[0], err),
+                line=self.lineno)]
+        result = []
+        for route in routes:
+            result.extend(self.run_method(route, source))
+        return result
+
+    def get_routes(self):
+        """
+        Returns a sequence of :class:`Route`, and the name of their source.
+        """
+        filename = self.arguments[0]
+        if filename.startswith('/') or filename.startswith(path.sep):
+            rel_filename = filename[1:]
+        else:
+            docdir = path.dirname(self.env.doc2path(self.env.docname,
+                                                    base=None))
+            rel_filename = path.join(docdir, filename)
+        filename = path.join(self.env.srcdir, rel_filename)
+        self.env.note_dependency(rel_filename)
+        return (route_table_cache.read(filename, self.options.get('format')),
+                filename)
+
+    def run_method(self, route, source):
+        """
+        Returns the nodes of the ``http:method`` directive for *route*,
+        read from the file *source*.
+        """
+        options = {}
+        if route.title:
+            options['title'] = route.title
+        if 'noindex' in self.options:
+            options['noindex'] = None
+        lines = route.content()
+        content = ViewList(lines, source)
+        directive = HTTPMethod('http:method', [route.sig], options, content,
+                               self.lineno, self.content_offset,
+                               self.block_text, self.state,
+                               self.state_machine)
+        return directive.run()
+
+
+class HTTPAutoRoutes(HTTPRoutes):
+    """
+    Describes the HTTP methods of a WSGI application with a Werkzeug URL
+    map, like a Flask application, given as ``module:app``.
+    """
+    option_spec = {
+        'prefix': directives.unchanged,
+        'noindex': directives.flag,
+    }
+
+    def get_routes(self):
+        spec = self.arguments[0].strip()
+        routes, sources = app_route_cache.get(spec,
+                                              self.options.get('prefix'))
+        for filename in sorted(sources):
+            self.env.note_dependency(filename)
+        return routes, spec
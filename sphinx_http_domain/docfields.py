@@ -30,6 +30,9 @@ class ResponseField(TypedField):
         -- is equivalent to --
 
         :param 404: Not Found
+
+    The field made for the responses keeps their status codes in its
+    ``responses`` attribute, for the directive to collect.
     """
     # List of HTTP Status Codes, derived from:
     # http://en.wikipedia.org/wiki/List_of_HTTP_status_codes
@@ -118,6 +121,11 @@ class ResponseField(TypedField):
             content = self.default_content(fieldarg)
         return super(TypedField, self).make_entry(fieldarg, content)
 
+    def make_field(self, types, domain, items):
+        field = super(ResponseField, self).make_field(types, domain, items)
+        field['responses'] = [fieldarg for fieldarg, content in items]
+        return field
+
 
 class NoArgGroupedField(GroupedField):
     def __init__(self, *args, **kwargs):
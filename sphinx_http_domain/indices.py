@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.domains.http
+    ~~~~~~~~~~~~~~~~~~~
+
+    Indices for the HTTP domain.
+"""
+
+from itertools import groupby
+
+from sphinx.locale import l_, _
+from sphinx.domains import Index
+
+from sphinx_http_domain.signatures import signature_cache
+
+
+# Usual order of methods for the same path; others sort after these
+method_order = dict((method, i) for i, method in
+                    enumerate(('GET', 'HEAD', 'POST', 'PUT', 'PATCH',
+                               'DELETE', 'OPTIONS')))
+
+
+def path_prefix(path):
+    """Returns the first segment of *path*, like ``/users``."""
+    return '/' + path.lstrip('/').split('/', 1)[0]
+
+
+class HTTPIndex(Index):
+    """
+    Index of all documented endpoints, grouped by the first segment of
+    their path, with the methods of a path collapsed under it, followed
+    by the responses.
+    """
+    name = 'endpoints'
+    localname = l_('HTTP Endpoint Index')
+    shortname = l_('endpoints')
+
+    def generate(self, docnames=None):
+        # Sort all rows once: methods by path prefix, path and method,
+        # then responses
+        rows = []
+        for name, entry in self.domain.data['method'].iteritems():
+            if docnames is not None and entry.docname not in docnames:
+                continue
+            parsed = signature_cache.parse(entry.sig)
+            if parsed is None:
+                continue
+            path = parsed.path or '/'
+            rows.append((0, path_prefix(path), path,
+                         method_order.get(entry.method, len(method_order)),
+                         entry.method, name, entry))
+        for name, entry in self.domain.data['response'].iteritems():
+            if docnames is not None and entry.docname not in docnames:
+                continue
+            rows.append((1, _('Responses'), entry.sig.lower(), 0, '', name,
+                         entry))
+        rows.sort()
+
+        content = []
+        collapse = False
+        for (rank, heading), group in groupby(rows, lambda row: row[:2]):
+            entries = []
+            typ = rank and 'response' or 'method'
+            for path, paths in groupby(group, lambda row: row[2]):
+                paths = list(paths)
+                if rank or len(paths) == 1:
+                    for row in paths:
+                        entries.append(self.make_entry(typ, row, 0))
+                    continue
+                # Several methods of one path: collapse them under it
+                collapse = True
+                first = paths[0]
+                entries.append([path, 1, first[6].docname,
+                                first[6].anchor, '', '', ''])
+                for row in paths:
+                    entries.append(self.make_entry(typ, row, 2))
+            content.append((heading, entries))
+        return content, collapse
+
+    def make_entry(self, typ, row, subtype):
+        """Returns the index entry for one sorted *row*."""
+        path, method, entry = row[2], row[4], row[6]
+        if typ == 'response':
+            display = entry.sig
+            description = ''
+        else:
+            display = subtype == 2 and method or method + ' ' + path
+            parts = []
+            if entry.title != entry.sig:
+                parts.append(entry.title)
+            if entry.responses:
+                parts.append('(%s)' % ', '.join(entry.responses))
+            description = ' '.join(parts)
+        return [display, subtype, entry.docname, entry.anchor, '', '',
+                description]
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.domains.http
+    ~~~~~~~~~~~~~~~~~~~
+
+    Lookup of HTTP domain entries in the inventories of other projects.
+
+    The ``http`` entries of each inventory listed in ``http_inventories``
+    are compiled into a file of sorted keys with an offset table, which
+    is memory-mapped and binary searched, so resolving a reference does
+    not need the inventory to be read again.  A compiled file is rebuilt
+    when the modification time or size of its inventory changes.
+"""
+
+from __future__ import with_statement
+
+import hashlib
+import mmap
+import os
+import re
+import struct
+import zlib
+from os import path
+
+from sphinx_http_domain.signatures import parse_route_key
+
+
+# RE for an entry line of a version 2 inventory
+inventory_re = re.compile(r'(.+?)\s+(\S+?):(\S+)\s+(-?\d+)\s+(\S+)\s+(.*)')
+
+
+def read_inventory(filename):
+    """
+    Yields (type, name, uri, dispname) for the ``http`` entries of the
+    Sphinx inventory *filename*.
+    """
+    with open(filename, 'rb') as f:
+        line = f.readline().rstrip()
+        if line != '# Sphinx inventory version 2':
+            raise ValueError('unsupported inventory format')
+        f.readline()    # Project
+        f.readline()    # Version
+        if 'zlib' not in f.readline():
+            raise ValueError('unsupported inventory compression')
+        data = zlib.decompress(f.read()).decode('utf-8')
+    for line in data.splitlines():
+        m = inventory_re.match(line.rstrip())
+        if m is None:
+            continue
+        name, domain, typ, _, uri, dispname = m.groups()
+        if domain != 'http':
+            continue
+        if uri.endswith('$'):
+            uri = uri[:-1] + name
+        if dispname == '-':
+            dispname = name
+        yield (typ, name, uri, dispname)
+
+
+def inventory_keys(typ, name, dispname):
+    """
+    Returns the lookup keys of an inventory entry: its name, and for
+    methods the canonical route key of its signature.
+    """
+    keys = [typ + ':' + name]
+    if typ == 'method':
+        route = parse_route_key(dispname)
+        if route is not None:
+            keys.append(typ + ':' + route)
+    return keys
+
+
+class CompiledInventory(object):
+    """
+    A memory-mapped compiled inventory.
+
+    The file starts with a header of a magic string, the modification
+    time and size of the inventory, and the number of records, followed
+    by a table of record offsets sorted by key.  Each record is its
+    key, URI and title, NUL-terminated and UTF-8 encoded.
+    """
+    magic = 'HTTPINV1'
+    header = struct.Struct('<8sdQI')
+    offset = struct.Struct('<I')
+
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.mtime, self.size, self.count = \
+            self.header.unpack_from(self.map)
+        if magic != self.magic:
+            self.close()
+            raise ValueError('not a compiled inventory')
+
+    @classmethod
+    def compile(cls, inventory, filename):
+        """
+        Compiles the Sphinx inventory file *inventory* into *filename*.
+        """
+        stat = os.stat(inventory)
+        records = {}
+        for typ, name, uri, dispname in read_inventory(inventory):
+            for key in inventory_keys(typ, name, dispname):
+                records.setdefault(key.encode('utf-8'),
+                                   (uri.encode('utf-8'),
+                                    dispname.encode('utf-8')))
+        keys = sorted(records)
+        table = []
+        body = []
+        pos = cls.header.size + cls.offset.size * len(keys)
+        for key in keys:
+            record = '\0'.join((key,) + records[key]) + '\0'
+            table.append(cls.offset.pack(pos))
+            body.append(record)
+            pos += len(record)
+        tmpname = filename + '.tmp'
+        with open(tmpname, 'wb') as f:
+            f.write(cls.header.pack(cls.magic, stat.st_mtime, stat.st_size,
+                                    len(keys)))
+            f.write(''.join(table))
+            f.write(''.join(body))
+        os.rename(tmpname, filename)
+
+    def is_current(self, inventory):
+        """Returns whether the inventory file is unchanged."""
+        stat = os.stat(inventory)
+        return stat.st_mtime == self.mtime and stat.st_size == self.size
+
+    def lookup(self, key):
+        """
+        Returns the (uri, title) of the record for *key*, or None.
+        """
+        key = key.encode('utf-8')
+        data = self.map
+        base = self.header.size
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self.offset.unpack_from(data, base +
+                                            mid * self.offset.size)[0]
+            end = data.find('\0', start)
+            other = data[start:end]
+            if other < key:
+                lo = mid + 1
+            elif other > key:
+                hi = mid
+            else:
+                uri_end = data.find('\0', end + 1)
+                title_end = data.find('\0', uri_end + 1)
+                return (data[end + 1:uri_end].decode('utf-8'),
+                        data[uri_end + 1:title_end].decode('utf-8'))
+        return None
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+class Inventories(object):
+    """
+    The compiled inventories of ``http_inventories``, in the order they
+    are searched.
+    """
+    def __init__(self):
+        self.inventories = []   # [(name, base URI, CompiledInventory)]
+
+    def load(self, mapping, srcdir, cachedir, warn):
+        """
+        Opens the compiled inventory for each (base URI, inventory file)
+        in *mapping*, compiling the ones which are missing or outdated.
+        Inventory files are relative to *srcdir*, and compiled files are
+        kept in *cachedir*.
+        """
+        self.close()
+        for name in sorted(mapping):
+            baseuri, inventory = mapping[name]
+            inventory = path.join(srcdir, inventory)
+            filename = path.join(cachedir, 'http_inventory-%s.bin' %
+                                 hashlib.md5(path.abspath(inventory)
+                                             .encode('utf-8')).hexdigest())
+            try:
+                compiled = None
+                if path.isfile(filename):
+                    try:
+                        compiled = CompiledInventory(filename)
+                    except Exception:
+                        pass
+                    else:
+                        if not compiled.is_current(inventory):
+                            compiled.close()
+                            compiled = None
+                if compiled is None:
+                    CompiledInventory.compile(inventory, filename)
+                    compiled = CompiledInventory(filename)
+            except Exception, err:
+                warn('failed to load HTTP inventory %s: %s' %
+                     (inventory, err))
+                continue
+            if baseuri and not baseuri.endswith('/'):
+                baseuri += '/'
+            self.inventories.append((name, baseuri, compiled))
+
+    def lookup(self, typ, target):
+        """
+        Returns the (absolute uri, title) of *target* of type *typ*, or
+        None.  *target* may be prefixed with the name of an inventory and
+        a colon, to search only that inventory.
+        """
+        inventories = self.inventories
+        if ':' in target:
+            prefix, rest = target.split(':', 1)
+            named = [item for item in inventories if item[0] == prefix]
+            if named:
+                inventories, target = named, rest
+        if not inventories:
+            return None
+        keys = [typ + ':' + target]
+        if typ == 'method':
+            route = parse_route_key(target)
+            if route is not None:
+                keys.append(typ + ':' + route)
+        for name, baseuri, compiled in inventories:
+            for key in keys:
+                found = compiled.lookup(key)
+                if found is not None:
+                    uri, title = found
+                    return (baseuri + uri, title)
+        return None
+
+    def close(self):
+        for name, baseuri, compiled in self.inventories:
+            compiled.close()
+        self.inventories = []
+
+
+inventories = Inventories()
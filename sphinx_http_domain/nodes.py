@@ -5,27 +5,44 @@
 
 from docutils import nodes
 
+import sphinx
 from sphinx.util.texescape import tex_escape_map
 
+from sphinx_http_domain.signatures import tokenize_url
+from sphinx_http_domain.utils import BoundedCache
+
 
 class HttpNode(nodes.Part, nodes.Inline, nodes.TextElement):
     """Generic HTTP node."""
     _writers = ['text', 'html', 'latex', 'man']
 
-    def set_first(self):
-        try:
-            self.children[0].first = True
-        except IndexError:
-            pass
+    def is_first(self):
+        """Returns whether the node is the first child of its parent."""
+        return self.parent is None or self.parent.children[0] is self
 
     @classmethod
-    def contribute_to_app(cls, app):
+    def contribute_to_app(cls, app, wrap=None):
+        """
+        Registers the node and its visitors with *app*.
+
+        *wrap*, if given, is called with a label and each visitor
+        function, and returns the function to register instead of the
+        one registered before.
+        """
         kwargs = {}
         for writer in cls._writers:
             visit = getattr(cls, 'visit_' + writer, None)
             depart = getattr(cls, 'depart_' + writer, None)
             if visit and depart:
+                if wrap is not None:
+                    visit = wrap('%s.visit_%s' % (cls.__name__, writer),
+                                 visit)
+                    depart = wrap('%s.depart_%s' % (cls.__name__, writer),
+                                  depart)
                 kwargs[writer] = (visit, depart)
+        if wrap is not None and sphinx.version_info >= (1, 4):
+            # Sphinx 1.4 warns about replaced visitors unless told so
+            kwargs['override'] = True
         app.add_node(cls, **kwargs)
 
     @staticmethod
@@ -87,11 +104,108 @@ class desc_http_method(HttpNode):
 
 
 class desc_http_url(HttpNode):
-    """HTTP URL node."""
+    """
+    HTTP URL node.
+
+    The URL the node was made from is kept as its ``rawsource``.
+
+    A compact URL node has the URL as its only child, a plain text node,
+    and nothing else.  The text keeps the words of the URL in the search
+    index, and is tokenized again to expand the node into the usual
+    subtree only while writing.
+    """
+    # Rendered HTML of whole URL subtrees, by translator class and URL
+    html_cache = BoundedCache(4096)
+    # Expanded subtrees of compact nodes, by URL
+    expansion_cache = BoundedCache(4096)
+
+    @classmethod
+    def compact(cls, url):
+        """Returns a compact node for *url*."""
+        return cls('', url)
+
+    def is_compact(self):
+        """Returns whether the node is a compact node."""
+        return len(self.children) == 1 and \
+            isinstance(self.children[0], nodes.Text)
+
+    def expand(self):
+        """
+        Returns the subtree of the node, which for compact nodes is
+        shared with other nodes and must not be modified.
+        """
+        if not self.is_compact():
+            return self
+        url = self.children[0]
+        urlnode = self.expansion_cache.get(url)
+        if urlnode is None:
+            path, segments, query, fragment = tokenize_url(url)
+            urlnode = desc_http_url()
+            pathnode = desc_http_path()
+            for text, arg in segments:
+                pathnode += nodes.Text(text)
+                if arg is not None:
+                    pathnode += desc_http_patharg(arg, arg)
+            urlnode += pathnode
+            if query:
+                querynode = desc_http_query()
+                for p in query.split('&'):
+                    querynode += desc_http_queryparam(p, p)
+                urlnode += querynode
+            if fragment:
+                urlnode += desc_http_fragment(fragment, fragment)
+            self.expansion_cache[url] = urlnode
+        return urlnode
+
+    def walk_children(self, translator):
+        """Walks *translator* over the (expanded) children of the node."""
+        for child in self.expand().children:
+            child.walkabout(translator)
+
+    def html_cache_key(self, translator):
+        """
+        Returns the key of the node in ``html_cache``, or None if its
+        markup cannot be shared with other nodes.
+        """
+        if self['ids'] or self['classes']:
+            return None
+        url = self.rawsource or self.is_compact() and self.children[0]
+        if not url:
+            return None
+        return (translator.__class__, url)
+
+    @staticmethod
+    def visit_text(self, node):
+        if node.is_compact():
+            node.walk_children(self)
+            raise nodes.SkipNode
+
     @staticmethod
     def visit_html(self, node):
-        self.body.append(self.starttag(node, 'tt', '',
-                                       CLASS='descname deschttpurl'))
+        key = node.html_cache_key(self)
+        if key is None:
+            self.body.append(self.starttag(node, 'tt', '',
+                                           CLASS='descname deschttpurl'))
+            if node.is_compact():
+                node.walk_children(self)
+                self.body.append('</tt>')
+                raise nodes.SkipNode
+            return
+        html = node.html_cache.get(key)
+        if html is None:
+            # Render the subtree on its own, through the usual visitors
+            body = self.body
+            self.body = [self.starttag(node, 'tt', '',
+                                       CLASS='descname deschttpurl')]
+            try:
+                node.walk_children(self)
+                self.body.append('</tt>')
+                html = ''.join(self.body)
+            finally:
+                self.body = body
+            node.html_cache[key] = html
+        self.body.append(html)
+        raise nodes.SkipNode
 
     @staticmethod
     def depart_html(self, node):
@@ -101,12 +215,22 @@ class desc_http_url(HttpNode):
     def visit_latex(self, node):
         self.body.append(r'\bfcode{')
         self.literal_whitespace += 1
+        if node.is_compact():
+            node.walk_children(self)
+            desc_http_url.depart_latex(self, node)
+            raise nodes.SkipNode
 
     @staticmethod
     def depart_latex(self, node):
         self.body.append(r'}')
         self.literal_whitespace -= 1
 
+    @staticmethod
+    def visit_man(self, node):
+        if node.is_compact():
+            node.walk_children(self)
+            raise nodes.SkipNode
+
 
 class desc_http_path(HttpNode):
     """HTTP path node. Contained in the URL node."""
@@ -186,7 +310,6 @@ class desc_http_query(HttpNode):
     @staticmethod
     def visit_text(self, node):
         self.add_text(node.prefix)
-        node.set_first()
 
     @staticmethod
     def visit_html(self, node):
@@ -194,7 +317,6 @@ class desc_http_query(HttpNode):
             self.starttag(node, 'span', '', CLASS='deschttpquery') +
             self.encode(node.prefix)
         )
-        node.set_first()
 
     @staticmethod
     def depart_html(self, node):
@@ -203,12 +325,10 @@ class desc_http_query(HttpNode):
     @staticmethod
     def visit_latex(self, node):
         self.body.append(node.prefix.translate(tex_escape_map))
-        node.set_first()
 
     @staticmethod
     def visit_man(self, node):
         self.body.append(self.deunicode(node.prefix))
-        node.set_first()
 
 
 class desc_http_queryparam(HttpNode):
@@ -216,18 +336,18 @@ class desc_http_queryparam(HttpNode):
     HTTP query string parameter node. Contained in the query string node.
 
     This node is created for each parameter inside a query string.
+    Parameters after the first are preceded by a separator.
     """
     child_text_separator = u'&'
-    first = False
 
     @staticmethod
     def visit_text(self, node):
-        if not node.first:
+        if not node.is_first():
             self.add_text(node.child_text_separator)
 
     @staticmethod
     def visit_html(self, node):
-        if not node.first:
+        if not node.is_first():
             self.body.append(self.encode(node.child_text_separator))
         self.body.append(self.starttag(node, 'em', '',
                                        CLASS='deschttpqueryparam'))
@@ -238,7 +358,7 @@ class desc_http_queryparam(HttpNode):
 
     @staticmethod
     def visit_latex(self, node):
-        if not node.first:
+        if not node.is_first():
             self.body.append(
                 node.child_text_separator.translate(tex_escape_map)
             )
@@ -250,7 +370,7 @@ class desc_http_queryparam(HttpNode):
 
     @staticmethod
     def visit_man(self, node):
-        if not node.first:
+        if not node.is_first():
             self.body.append(self.deunicode(node.child_text_separator))
         self.body.append(self.defs['emphasis'][0])
 
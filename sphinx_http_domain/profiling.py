@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.domains.http
+    ~~~~~~~~~~~~~~~~~~~
+
+    Opt-in build profiling for the HTTP domain.
+
+    With ``http_profile = True`` in conf.py, directive, resolver and
+    node visitor calls are timed per document and per signature, and
+    a summary of the slowest ones is written at the end of the build.
+
+    The profile of a build is kept in this module rather than on the
+    environment, so that it is never pickled with it.  Only parallel
+    readers put their timings on their copy of the environment, which
+    is how they are sent back to the main process.
+"""
+
+from __future__ import with_statement
+
+import os
+from functools import wraps
+from os import path
+from time import time
+
+
+# The Profile of the current build, or None if not profiling
+current = None
+
+
+class Profile(object):
+    """Cumulative timings and call counts of the HTTP domain."""
+    def __init__(self):
+        self.pid = os.getpid()
+        self.labels = {}    # label -> [seconds, calls]
+        self.docs = {}      # docname -> [seconds, calls]
+        self.sigs = {}      # (label, sig) -> [seconds, calls]
+
+    def add(self, label, docname, sig, elapsed):
+        """
+        Records a call under *label*, for *docname* and *sig* unless they
+        are None.
+        """
+        self.add_to(self.labels, label, elapsed)
+        if docname is not None:
+            self.add_to(self.docs, docname, elapsed)
+        if sig is not None:
+            self.add_to(self.sigs, (label, sig), elapsed)
+
+    def add_to(self, table, key, elapsed):
+        try:
+            stats = table[key]
+        except KeyError:
+            stats = table[key] = [0.0, 0]
+        stats[0] += elapsed
+        stats[1] += 1
+
+    def merge(self, other):
+        """Adds the timings of *other*, e.g. from a parallel reader."""
+        for table, othertable in ((self.labels, other.labels),
+                                  (self.docs, other.docs),
+                                  (self.sigs, other.sigs)):
+            for key, (seconds, calls) in othertable.iteritems():
+                stats = table.setdefault(key, [0.0, 0])
+                stats[0] += seconds
+                stats[1] += calls
+
+    def report(self, limit=20):
+        """Returns a summary of the slowest calls, as a list of lines."""
+        lines = []
+        for title, table, fmt in (
+            ('Calls', self.labels, '%s'),
+            ('Slowest documents', self.docs, '%s'),
+            ('Slowest signatures', self.sigs, '%s: %s'),
+        ):
+            lines.append(title)
+            lines.append('-' * len(title))
+            slowest = sorted(table.iteritems(), key=lambda item: -item[1][0])
+            for key, (seconds, calls) in slowest[:limit]:
+                lines.append('%10.4fs %8d  %s' % (seconds, calls,
+                                                  fmt % key))
+            lines.append('')
+        return lines
+
+
+def get_profile(env):
+    """
+    Returns the :class:`Profile` to record calls with *env* in, or None
+    if not profiling.
+    """
+    if current is None or current.pid == os.getpid():
+        return current
+    # A parallel reader: collect timings on its copy of the environment
+    profile = env.__dict__.get('http_profile')
+    if profile is None:
+        profile = env.http_profile = Profile()
+    return profile
+
+
+def profiled(label, sig_arg, docname_arg=None):
+    """
+    Decorates a directive or domain method to be timed under *label*.
+
+    *sig_arg* and *docname_arg* are the indices of the signature and
+    document name among the positional arguments.  Without
+    *docname_arg*, the document currently being read is used.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if current is None:
+                return func(self, *args, **kwargs)
+            profile = get_profile(self.env)
+            if docname_arg is None:
+                docname = self.env.docname
+            else:
+                docname = args[docname_arg]
+            start = time()
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                profile.add(label, docname, args[sig_arg], time() - start)
+        return wrapper
+    return decorator
+
+
+def profiled_visitor(label, func):
+    """
+    Returns the node visitor *func* timed under *label* while profiling.
+    """
+    @wraps(func)
+    def wrapper(self, node):
+        builder = current is not None and getattr(self, 'builder', None)
+        if not builder:
+            return func(self, node)
+        profile = get_profile(builder.env)
+        start = time()
+        try:
+            return func(self, node)
+        finally:
+            profile.add(label, getattr(builder, 'current_docname', None),
+                        None, time() - start)
+    return wrapper
+
+
+def init_profile(app):
+    """Starts profiling if enabled, on ``builder-inited``."""
+    global current
+    current = app.config.http_profile and Profile() or None
+
+
+def merge_profile(app, env, docnames, other):
+    """Collects timings of parallel readers, on ``env-merge-info``."""
+    otherprofile = other.__dict__.pop('http_profile', None)
+    if current is not None and otherprofile is not None:
+        current.merge(otherprofile)
+
+
+def write_profile(app, exception):
+    """Writes the timing report, on ``build-finished``."""
+    global current
+    profile = current
+    current = None
+    if profile is None or exception is not None:
+        return
+    lines = profile.report(app.config.http_profile_limit)
+    if app.parallel > 1:
+        lines.append('Node visitors are timed in the main process only; '
+                     'documents written')
+        lines.append('by parallel writers are missing from their timings.')
+    filename = path.join(app.outdir, 'http_profile.txt')
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines).encode('utf-8'))
+    app.info('HTTP domain profile written to %s' % filename)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.domains.http
+    ~~~~~~~~~~~~~~~~~~~
+
+    Entries of the HTTP domain data.
+
+    Entries are kept for every description in the pickled environment,
+    so they are slotted, share their docname strings, and store a title
+    equal to the signature only once.
+"""
+
+
+_docnames = {}
+
+
+def intern_docname(docname):
+    """Returns the shared copy of *docname*."""
+    return _docnames.setdefault(docname, docname)
+
+
+class Entry(object):
+    """
+    An entry of ``HTTPDomain.data``, describing one object.
+
+    *anchor* is the ID of the object's target in its document, and
+    *line* the line of its description, for warnings.
+    """
+    __slots__ = ('docname', 'sig', 'title', 'anchor', 'line')
+    fields = __slots__
+
+    def __init__(self, docname, sig, title, anchor=None, line=None):
+        self.docname = intern_docname(docname)
+        self.sig = sig
+        # Titles default to the signature, so share the string
+        self.title = sig if title == sig else title
+        self.anchor = anchor
+        self.line = line
+
+    def __reduce__(self):
+        return (self.__class__, self.astuple())
+
+    def __repr__(self):
+        return '%s%r' % (self.__class__.__name__, self.astuple())
+
+    def astuple(self):
+        """Returns the fields of the entry as a tuple."""
+        return tuple(getattr(self, field) for field in self.fields)
+
+
+class MethodEntry(Entry):
+    """
+    An entry for an HTTP method.
+
+    *route* is the canonical route key of the signature, as returned by
+    :func:`~sphinx_http_domain.signatures.route_key`.
+    """
+    __slots__ = ('method', 'responses', 'route')
+    fields = ('docname', 'sig', 'title') + __slots__ + ('anchor', 'line')
+
+    def __init__(self, docname, sig, title, method, responses=(),
+                 route=None, anchor=None, line=None):
+        super(MethodEntry, self).__init__(docname, sig, title, anchor, line)
+        self.method = method
+        self.responses = tuple(responses)
+        self.route = route
+
+
+class ResponseEntry(Entry):
+    """An entry for an HTTP response."""
+    __slots__ = ()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.domains.http
+    ~~~~~~~~~~~~~~~~~~~
+
+    Route index for the HTTP domain.
+"""
+
+import re
+
+from sphinx_http_domain.signatures import (has_path, signature_cache,
+                                           split_path)
+
+
+class RouteNode(object):
+    """A node of a :class:`RouteTrie`, standing for one path segment."""
+    __slots__ = ('literals', 'patterns', 'wildcard', 'name')
+
+    def __init__(self):
+        self.literals = {}      # segment text -> RouteNode
+        self.patterns = []      # [(compiled RE, RouteNode)]
+        self.wildcard = None    # RouteNode for a bare {arg} segment
+        self.name = None        # name of the route ending here
+
+
+class RouteTrie(object):
+    """
+    Maps concrete URLs to the documented route templates they match.
+
+    There is one trie per HTTP method, over the ``/``-separated segments
+    of the path.  A segment that is a bare ``{arg}`` matches any value,
+    a segment mixing text and arguments (``v{version}.json``) is matched
+    with a regular expression, and anything else must match exactly.
+    Literal segments win over patterns, and patterns over wildcards.
+    """
+    def __init__(self):
+        self.roots = {}
+
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        Returns a trie for the ``method`` entries of the domain data.
+        """
+        trie = cls()
+        for name, entry in entries.iteritems():
+            method, path = split_signature(entry.sig)
+            if path:
+                trie.add(method, path, name)
+        return trie
+
+    def add(self, method, path, name):
+        """Adds the route template *path* for *method* under *name*."""
+        node = self.roots.setdefault(method.upper(), RouteNode())
+        for segment in path.split('/'):
+            node = self.add_segment(node, segment)
+        if node.name is None:
+            node.name = name
+
+    def add_segment(self, node, segment):
+        """Returns the child of *node* for the template *segment*."""
+        parts = split_path(segment)
+        if not any(arg is not None for _, arg in parts):
+            return node.literals.setdefault(segment, RouteNode())
+        if len(parts) == 1 and not parts[0][0]:
+            if node.wildcard is None:
+                node.wildcard = RouteNode()
+            return node.wildcard
+        regex = re.compile(
+            ''.join(re.escape(text) + ('[^/]+?' if arg is not None else '')
+                    for text, arg in parts) + '$'
+        )
+        for other, child in node.patterns:
+            if other.pattern == regex.pattern:
+                return child
+        child = RouteNode()
+        node.patterns.append((regex, child))
+        return child
+
+    def match(self, method, path):
+        """
+        Returns the name of the route matching the concrete *path* for
+        *method*, or None.
+        """
+        root = self.roots.get(method.upper())
+        if root is None:
+            return None
+        return self.match_segments(root, path.split('/'), 0)
+
+    def match_segments(self, node, segments, i):
+        if i == len(segments):
+            return node.name
+        segment = segments[i]
+        child = node.literals.get(segment)
+        if child is not None:
+            name = self.match_segments(child, segments, i + 1)
+            if name is not None:
+                return name
+        if segment:
+            for regex, child in node.patterns:
+                if regex.match(segment):
+                    name = self.match_segments(child, segments, i + 1)
+                    if name is not None:
+                        return name
+            if node.wildcard is not None:
+                return self.match_segments(node.wildcard, segments, i + 1)
+        return None
+
+    def match_signature(self, sig):
+        """
+        Returns the name of the route matching a concrete method
+        signature like ``GET /users/42``, or None.
+        """
+        if not has_path(sig):
+            return None
+        method, path = split_signature(sig)
+        if not path.startswith('/'):
+            return None
+        return self.match(method, path)
+
+
+def split_signature(sig):
+    """
+    Splits an HTTP method signature into its method and path.
+    The method defaults to ``GET``.
+    """
+    parsed = signature_cache.parse(sig)
+    if parsed is None:
+        return ('GET', '')
+    return ((parsed.method or 'GET').upper(), parsed.path)
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.domains.http
+    ~~~~~~~~~~~~~~~~~~~
+
+    Reading of route tables for the ``http:routes`` directive.
+
+    A route table lists HTTP methods as rows, in JSON, JSON Lines, YAML or
+    CSV.  Rows are read one at a time where the format allows it, and
+    turned into :class:`Route` tuples, which are cached by the content
+    hash of the file.
+"""
+
+from __future__ import with_statement
+
+import codecs
+import csv
+import hashlib
+import json
+import re
+from collections import namedtuple
+from os import path
+
+from sphinx_http_domain.utils import BoundedCache, PersistentCache
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+formats = {
+    '.json': 'json',
+    '.jsonl': 'jsonl',
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+    '.csv': 'csv',
+}
+
+
+class RouteTableError(Exception):
+    """Raised for route tables which cannot be read."""
+
+
+class Route(namedtuple('Route', 'sig title description args params '
+                                'responses')):
+    """
+    An HTTP method read from a route table.
+
+    * `sig`         -- the signature, like ``GET /users/{id}``
+    * `title`       -- the title, or None
+    * `description` -- tuple of the lines of the description
+    * `args`        -- tuple of (name, description) of the path arguments
+    * `params`      -- tuple of (name, description) of the query params
+    * `responses`   -- tuple of (type, status code, description) of the
+      responses, where *type* may be empty
+    """
+    __slots__ = ()
+
+    def content(self):
+        """Returns the lines of the content of an ``http:method``."""
+        lines = list(self.description)
+        # Continue a field list ending the description
+        if lines and not ends_with_fields(lines):
+            lines.append('')
+        for name, text in self.args:
+            lines.append(':arg %s: %s' % (name, text))
+        for name, text in self.params:
+            lines.append(':param %s: %s' % (name, text))
+        for typ, code, text in self.responses:
+            lines.append(':resp %s: %s' % ((typ + ' ' + code).strip(), text))
+        return lines
+
+
+# RE for the marker of a field, like ":arg id:" or ":resp 200:"
+field_re = re.compile(r'^:[^:\s][^:]*:(?:\s|$)')
+
+
+def ends_with_fields(lines):
+    """Returns whether the last block of *lines* is a field list."""
+    for line in reversed(lines):
+        if not line.strip():
+            return False
+        if field_re.match(line):
+            return True
+    return False
+
+
+def pairs(value):
+    """
+    Returns a tuple of (name, description) pairs from a dict, a list of
+    dicts with ``name`` and ``description``, or a list of names.
+    """
+    if not value:
+        return ()
+    if isinstance(value, dict):
+        return tuple((unicode(name), unicode(text or ''))
+                     for name, text in sorted(value.iteritems()))
+    result = []
+    for item in value:
+        if isinstance(item, dict):
+            result.append((unicode(item['name']),
+                           unicode(item.get('description') or '')))
+        else:
+            result.append((unicode(item), u''))
+    return tuple(result)
+
+
+def responses(value):
+    """
+    Returns a tuple of (type, status code, description) from a dict of
+    status codes to descriptions or to dicts with ``type`` and
+    ``description``, or a list of status codes or of dicts with ``code``,
+    ``type`` and ``description``.
+    """
+    if not value:
+        return ()
+    if isinstance(value, dict):
+        items = sorted(value.iteritems())
+    else:
+        items = [isinstance(item, dict) and (item['code'], item) or (item, '')
+                 for item in value]
+    result = []
+    for code, text in items:
+        typ = ''
+        if isinstance(text, dict):
+            typ = text.get('type') or ''
+            text = text.get('description') or ''
+        result.append((unicode(typ), unicode(code), unicode(text or '')))
+    return tuple(result)
+
+
+def route_from_row(row):
+    """
+    Returns a :class:`Route` for a *row*, a dict with either a
+    ``signature`` or a ``path`` and optional ``method``, and optional
+    ``title``, ``description``, ``args``, ``params`` and ``responses``.
+    """
+    if not isinstance(row, dict):
+        raise RouteTableError('route is not a mapping: %r' % (row,))
+    sig = row.get('signature')
+    if not sig:
+        url = row.get('path') or row.get('url')
+        if not url:
+            raise RouteTableError('route has no signature or path: %r' %
+                                  (row,))
+        sig = u'%s %s' % ((row.get('method') or 'GET').upper(), url)
+    return Route(unicode(sig).strip(), row.get('title') or None,
+                 tuple(unicode(row.get('description') or '').splitlines()),
+                 pairs(row.get('args')), pairs(row.get('params')),
+                 responses(row.get('responses')))
+
+
+def iter_rows(f, format):
+    """Yields the rows of the route table in the open file *f*."""
+    if format == 'jsonl':
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+    elif format == 'json':
+        data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get('routes', ())
+        for row in data:
+            yield row
+    elif format == 'yaml':
+        if yaml is None:
+            raise RouteTableError('reading YAML route tables requires PyYAML')
+        for data in yaml.safe_load_all(f):
+            if isinstance(data, dict) and 'routes' in data:
+                data = data['routes']
+            if isinstance(data, list):
+                for row in data:
+                    yield row
+            elif data is not None:
+                yield data
+    elif format == 'csv':
+        # Columns arg:NAME, param:NAME and resp:CODE hold the descriptions
+        # of path arguments, query params and responses
+        for record in csv.DictReader(f):
+            row = {'args': {}, 'params': {}, 'responses': {}}
+            for key, value in record.iteritems():
+                if key is None:
+                    continue
+                key = key.decode('utf-8').strip()
+                value = (value or '').decode('utf-8')
+                kind, _, name = key.partition(':')
+                if kind in ('arg', 'param') and name:
+                    if value:
+                        row[kind + 's'][name] = value
+                elif kind == 'resp' and name:
+                    if value:
+                        row['responses'][name] = value
+                else:
+                    row[key] = value
+            yield row
+    else:
+        raise RouteTableError('unknown route table format %r' % format)
+
+
+def read_route_table(filename, format=None):
+    """
+    Reads the route table *filename*, in *format*, or the format implied
+    by the extension of the file.  Returns a tuple of :class:`Route`.
+    """
+    if format is None:
+        format = formats.get(path.splitext(filename)[1].lower())
+        if format is None:
+            raise RouteTableError('cannot tell the format of %s' % filename)
+    if format == 'csv':
+        f = open(filename, 'rb')
+    else:
+        f = codecs.open(filename, 'r', 'utf-8')
+    with f:
+        try:
+            return tuple(route_from_row(row) for row in iter_rows(f, format))
+        except (ValueError, KeyError, TypeError), err:
+            raise RouteTableError('%s: %s' % (filename, err))
+
+
+class RouteTableCache(PersistentCache):
+    """
+    Memoizes :func:`read_route_table` by the content hash of the file,
+    so that unchanged route tables are not read again.
+    """
+    # Bump this when Route or read_route_table() change
+    version = 1
+
+    def __init__(self, maxsize=64):
+        PersistentCache.__init__(self, BoundedCache(maxsize))
+
+    def read(self, filename, format=None):
+        """Returns the (possibly cached) routes of *filename*."""
+        with open(filename, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        key = (digest, format or path.splitext(filename)[1].lower())
+        routes = self.cache.get(key)
+        if routes is None:
+            routes = read_route_table(filename, format)
+            self.add(key, routes)
+        return routes
+
+    def dump_value(self, routes):
+        return tuple(tuple(route) for route in routes)
+
+    def load_value(self, routes):
+        return tuple(Route(*route) for route in routes)
+
+
+route_table_cache = RouteTableCache()
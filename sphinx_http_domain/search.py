@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.domains.http
+    ~~~~~~~~~~~~~~~~~~~
+
+    Endpoint search index for the HTML builders.
+
+    Methods are left out of Sphinx's ``searchindex.js`` and written to a
+    compact index of their own, ``_static/httpindex.js``, which is
+    searched by ``_static/httpsearch.js`` on the search page:
+
+    * `methods`   -- the HTTP methods, known ones first
+    * `docs`      -- the URIs of the documents, relative to the root
+    * `paths`     -- the sorted paths, each as the length of the prefix it
+      shares with the previous path and the rest of it
+    * `masks`     -- for each path, the bitmap of its methods, where the
+      bit of a method is its index, but at most `max_bit`
+    * `endpoints` -- (path, method, document, anchor, title) of each
+      method, by index, sorted by path; the title is 0 if it is the
+      signature
+    * `trigrams`  -- the trigrams of the normalized paths, each mapped to
+      the delta-encoded indices of the paths containing it
+"""
+
+from __future__ import with_statement
+
+import codecs
+import json
+import re
+from os import path
+
+from sphinx_http_domain.signatures import signature_cache
+
+
+# Methods with fixed bits, so common bitmaps are small numbers
+known_methods = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+# Highest bit of the bitmaps, shared by all methods from it on, so that
+# they stay positive 32-bit integers for JavaScript's bitwise operators
+max_bit = 30
+
+# RE for path arguments, which are searched for regardless of their name
+arg_re = re.compile(r'\{[^}]*\}')
+
+static_dir = path.join(path.dirname(__file__), 'static')
+
+
+def normalize_path(path):
+    """Returns *path* as searched for: lower case, arguments as ``{}``."""
+    return arg_re.sub('{}', path.lower())
+
+
+def trigrams(text):
+    """Returns the set of trigrams of *text*."""
+    return set(text[i:i + 3] for i in xrange(len(text) - 2))
+
+
+def shared_prefix(a, b):
+    """Returns the length of the common prefix of *a* and *b*."""
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def build_search_index(domain, builder):
+    """Returns the endpoint search index of *domain* as a dict."""
+    methods = list(known_methods)
+    method_indices = dict((method, i) for i, method in enumerate(methods))
+    rows = []
+    for name, entry in domain.data['method'].iteritems():
+        parsed = signature_cache.parse(entry.sig)
+        if parsed is None:
+            continue
+        method = entry.method.upper()
+        if method not in method_indices:
+            method_indices[method] = len(methods)
+            methods.append(method)
+        rows.append((parsed.path or '/', method_indices[method], name, entry))
+    rows.sort()
+
+    docs = []
+    doc_indices = {}
+    paths = []
+    masks = []
+    endpoints = []
+    grams = {}
+    previous = ''
+    for path_, method, name, entry in rows:
+        if not paths or path_ != paths[-1][1]:
+            i = len(paths)
+            paths.append((shared_prefix(previous, path_), path_))
+            masks.append(0)
+            previous = path_
+            for gram in trigrams(normalize_path(path_)):
+                grams.setdefault(gram, []).append(i)
+        masks[-1] |= 1 << min(method, max_bit)
+        docindex = doc_indices.get(entry.docname)
+        if docindex is None:
+            docindex = doc_indices[entry.docname] = len(docs)
+            docs.append(builder.get_target_uri(entry.docname))
+        endpoints.append([len(paths) - 1, method, docindex, entry.anchor,
+                          entry.title != entry.sig and entry.title or 0])
+
+    # Delta-encode the ascending posting lists
+    for gram, indices in grams.iteritems():
+        grams[gram] = [indices[0]] + [b - a for a, b in zip(indices,
+                                                            indices[1:])]
+    return {
+        'methods': methods,
+        'docs': docs,
+        'paths': [[shared, path_[shared:]] for shared, path_ in paths],
+        'masks': masks,
+        'endpoints': endpoints,
+        'trigrams': grams,
+    }
+
+
+def add_static_path(app):
+    """Adds the static files of the endpoint search to HTML builds."""
+    if app.config.http_search_index and \
+            getattr(app.builder, 'format', None) == 'html':
+        # A new list, as the default one is shared by all applications
+        if static_dir not in app.config.html_static_path:
+            app.config.html_static_path = \
+                list(app.config.html_static_path) + [static_dir]
+        app.add_javascript('httpsearch.js')
+
+
+def write_search_index(app, exception):
+    """Writes ``_static/httpindex.js`` after a successful HTML build."""
+    if exception is not None or not app.config.http_search_index or \
+            getattr(app.builder, 'format', None) != 'html':
+        return
+    index = build_search_index(app.env.domains['http'], app.builder)
+    staticdir = path.join(app.builder.outdir, '_static')
+    if not path.isdir(staticdir):
+        return
+    with codecs.open(path.join(staticdir, 'httpindex.js'), 'w',
+                     'utf-8') as f:
+        f.write('HTTPSearch.setIndex(')
+        f.write(json.dumps(index, separators=(',', ':'), sort_keys=True))
+        f.write(');')
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.domains.http
+    ~~~~~~~~~~~~~~~~~~~
+
+    Parsing of HTTP method signatures for the HTTP domain.
+"""
+
+import re
+from collections import namedtuple
+
+from sphinx_http_domain.utils import BoundedCache, PersistentCache
+
+
+# RE for the HTTP method at the start of a signature: any token as
+# defined by RFC 7230, so custom verbs work too
+method_re = re.compile(r"([!#$%&'*+.^_`|~0-9A-Za-z-]+)\s+(?=\S)")
+
+# RE for a scheme and host in front of the path, which are ignored
+netloc_re = re.compile(r'(?:[A-Za-z][A-Za-z0-9+.-]*:)?//[^/?#]*')
+
+# RE for the tokens of a URL.  Every character of the URL is part of
+# exactly one token, so a single finditer() scan tokenizes all of it.
+token_re = re.compile(
+    r"""
+      (?P<text>[^{?#]+)         # Plain text in the path
+    | \{(?P<arg>[^}?#]*)\}      # {arg} in matched braces
+    | (?P<brace>\{)             # Unmatched brace, as plain text
+    | \?(?P<query>[^#]*)        # Query string
+    | \#(?P<fragment>.*)        # Fragment
+    """,
+    re.VERBOSE | re.DOTALL
+)
+
+
+class ParsedSignature(namedtuple('ParsedSignature',
+                                 'method url path segments query params '
+                                 'fragment')):
+    """
+    A tokenized HTTP method signature.
+
+    * `method`   -- the HTTP method as written, or None
+    * `url`      -- the full URL
+    * `path`     -- the path component of the URL
+    * `segments` -- tuple of (text, arg) pairs making up the path, where
+      *arg* is the name of a ``{arg}`` following *text*, which may be
+      empty, or None
+    * `query`    -- the query string
+    * `params`   -- tuple of the ``&``-separated query parameters
+    * `fragment` -- the fragment
+    """
+    __slots__ = ()
+
+
+def tokenize_url(url, pos=0):
+    """
+    Tokenizes *url* from *pos* in a single scan.
+    Returns (path, path segments, query, fragment).
+    """
+    if not url.startswith('/', pos) or url.startswith('//', pos):
+        m = netloc_re.match(url, pos)
+        if m is not None:
+            pos = m.end()
+    end = len(url)
+    segments = []
+    text = ''
+    query = fragment = ''
+    for m in token_re.finditer(url, pos):
+        kind = m.lastgroup
+        if kind == 'text' or kind == 'brace':
+            text += m.group()
+        elif kind == 'arg':
+            segments.append((text, m.group(kind)))
+            text = ''
+        else:
+            if kind == 'query':
+                query = m.group(kind)
+            else:
+                fragment = m.group(kind)
+            if end > m.start():
+                end = m.start()
+    if text:
+        segments.append((text, None))
+    return (url[pos:end], tuple(segments), query, fragment)
+
+
+def split_path(path):
+    """
+    Returns a tuple of (text, arg) pairs for the ``{arg}`` placeholders
+    in *path*, with the braces stripped off the argument names.
+    """
+    return tokenize_url(path)[1]
+
+
+def parse_signature(sig):
+    """
+    Parses an HTTP method signature, like ``GET /users/{id}?page#top``.
+    Returns a :class:`ParsedSignature`, or None if *sig* is not valid.
+    """
+    sig = sig.strip()
+    if not sig:
+        return None
+    m = method_re.match(sig)
+    if m is None:
+        method = None
+        pos = 0
+    else:
+        method = m.group(1)
+        pos = m.end()
+    path, segments, query, fragment = tokenize_url(sig, pos)
+    return ParsedSignature(method, sig[pos:], path, segments, query,
+                           tuple(query.split('&')) if query else (),
+                           fragment)
+
+
+def route_key(method, segments, params=()):
+    """
+    Returns the canonical route key for *method*, and the path *segments*
+    and query *params* of a :class:`ParsedSignature`, like
+    ``GET /users/{}`` or ``GET /search?page&q``.
+
+    Path arguments lose their names, trailing slashes are dropped and
+    query parameters are sorted, so equivalent templates have the same
+    key.  Methods differing in their query have different keys, just
+    like their names.
+    """
+    path = ''.join(text + ('{}' if arg is not None else '')
+                   for text, arg in segments)
+    key = (method or 'GET').upper() + ' ' + (path.rstrip('/') or '/')
+    if params:
+        key += '?' + '&'.join(sorted(params))
+    return key
+
+
+def has_path(sig):
+    """
+    Returns whether *sig* looks like a signature with a path, like
+    ``GET /users`` or ``/users``, rather than a name like ``get-users``,
+    without parsing it.
+    """
+    sig = sig.lstrip()
+    m = method_re.match(sig)
+    pos = m.end() if m is not None else 0
+    return sig.startswith('/', pos) or netloc_re.match(sig, pos) is not None
+
+
+def parse_route_key(sig):
+    """
+    Returns the canonical route key of the HTTP method signature *sig*,
+    or None if *sig* is not valid.
+
+    Anything but a signature with a path is rejected before it reaches
+    the signature cache, so names do not end up in it.
+    """
+    if not has_path(sig):
+        return None
+    parsed = signature_cache.parse(sig)
+    if parsed is None or not parsed.path.startswith('/'):
+        return None
+    return route_key(parsed.method, parsed.segments, parsed.params)
+
+
+class SignatureCache(PersistentCache):
+    """
+    Memoizes :func:`parse_signature` by raw signature string.
+
+    The cache can be saved to and loaded from a file, so that unchanged
+    signatures are not parsed again across incremental builds.
+    """
+    # Bump this when ParsedSignature or parse_signature() change
+    version = 3
+
+    def __init__(self, maxsize=16384):
+        PersistentCache.__init__(self, BoundedCache(maxsize))
+
+    def parse(self, sig):
+        """Returns the (possibly cached) :class:`ParsedSignature` for *sig*."""
+        parsed = self.cache.get(sig)
+        if parsed is None:
+            parsed = parse_signature(sig)
+            if parsed is not None:
+                self.add(sig, parsed)
+        return parsed
+
+    def dump_value(self, parsed):
+        return tuple(parsed)
+
+    def load_value(self, parsed):
+        return ParsedSignature(*parsed)
+
+
+signature_cache = SignatureCache()
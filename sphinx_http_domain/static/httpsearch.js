@@ -0,0 +1,201 @@
+/*
+ * httpsearch.js
+ * ~~~~~~~~~~~~~
+ *
+ * Endpoint search for the HTTP domain.
+ *
+ * On the search page, loads _static/httpindex.js and lists the HTTP
+ * methods whose path matches the query above the other results.  A
+ * query may start with a method, like "GET /users/{id}"; argument names
+ * do not matter, and concrete values like "/users/42" match arguments.
+ *
+ * :copyright: Copyright 2011, David Zentgraf.
+ * :license: BSD, see LICENSE for details
+ */
+
+var HTTPSearch = {
+
+  index: null,
+  pending: null,
+  // Highest bit of the path bitmaps, shared by all methods from it on
+  maxBit: 30,
+
+  setIndex: function(index) {
+    // Undo the prefix compression of the paths
+    var paths = [], previous = '';
+    for (var i = 0; i < index.paths.length; i++) {
+      previous = previous.substr(0, index.paths[i][0]) + index.paths[i][1];
+      paths.push(previous);
+    }
+    index.paths = paths;
+    index.normalized = [];
+    for (i = 0; i < paths.length; i++)
+      index.normalized.push(HTTPSearch.normalize(paths[i]));
+    // Undo the delta encoding of the posting lists
+    for (var gram in index.trigrams) {
+      var postings = index.trigrams[gram];
+      for (i = 1; i < postings.length; i++)
+        postings[i] += postings[i - 1];
+    }
+    HTTPSearch.index = index;
+    if (HTTPSearch.pending !== null) {
+      HTTPSearch.show(HTTPSearch.pending);
+      HTTPSearch.pending = null;
+    }
+  },
+
+  normalize: function(path) {
+    return path.toLowerCase().replace(/\{[^}]*\}/g, '{}');
+  },
+
+  /**
+   * Returns the indices of the paths containing *text*, by intersecting
+   * the posting lists of its trigrams.
+   */
+  candidates: function(text) {
+    var index = HTTPSearch.index, result = null, i;
+    if (text.length < 3) {
+      result = [];
+      for (i = 0; i < index.paths.length; i++)
+        result.push(i);
+      return result;
+    }
+    for (i = 0; i + 3 <= text.length; i++) {
+      var postings = index.trigrams[text.substr(i, 3)];
+      if (!postings)
+        return [];
+      if (result === null) {
+        result = postings;
+        continue;
+      }
+      var merged = [], a = 0, b = 0;
+      while (a < result.length && b < postings.length) {
+        if (result[a] < postings[b]) a++;
+        else if (result[a] > postings[b]) b++;
+        else { merged.push(result[a]); a++; b++; }
+      }
+      result = merged;
+      if (!result.length)
+        break;
+    }
+    return result;
+  },
+
+  /**
+   * Returns the indices of the paths whose arguments match the values
+   * of the concrete path *text*.
+   */
+  templateMatches: function(text) {
+    var index = HTTPSearch.index, result = [];
+    var segments = text.split('/');
+    for (var i = 0; i < index.normalized.length; i++) {
+      var other = index.normalized[i].split('/');
+      if (other.length != segments.length)
+        continue;
+      var matches = true;
+      for (var j = 0; j < other.length && matches; j++) {
+        if (other[j] == segments[j])
+          continue;
+        var pattern = other[j].split('{}');
+        if (pattern.length == 1 || !segments[j]) {
+          matches = false;
+          continue;
+        }
+        for (var k = 0; k < pattern.length; k++)
+          pattern[k] = pattern[k].replace(/[.*+?^$()|[\]\\]/g, '\\$&');
+        matches = new RegExp('^' + pattern.join('[^/]+') + '$')
+          .test(segments[j]);
+      }
+      if (matches)
+        result.push(i);
+    }
+    return result;
+  },
+
+  /**
+   * Returns the endpoints matching *query*, as objects with the method,
+   * path, title and URI of each.
+   */
+  query: function(query) {
+    var index = HTTPSearch.index, method = -1, mask = -1, results = [], i;
+    query = query.replace(/^\s+|\s+$/g, '');
+    var m = /^([A-Za-z]+)\s+(.*)$/.exec(query);
+    if (m) {
+      method = index.methods.indexOf(m[1].toUpperCase());
+      if (method < 0)
+        return results;
+      mask = 1 << Math.min(method, HTTPSearch.maxBit);
+      query = m[2];
+    }
+    var text = HTTPSearch.normalize(query.split(/[?#]/)[0]);
+    if (!text)
+      return results;
+    var found = [];
+    var candidates = HTTPSearch.candidates(text);
+    for (i = 0; i < candidates.length; i++)
+      if (index.normalized[candidates[i]].indexOf(text) >= 0)
+        found.push(candidates[i]);
+    if (!found.length && text.charAt(0) == '/')
+      found = HTTPSearch.templateMatches(text.replace(/\/+$/, ''));
+    var wanted = {};
+    for (i = 0; i < found.length; i++)
+      if (index.masks[found[i]] & mask)
+        wanted[found[i]] = true;
+    var root = DOCUMENTATION_OPTIONS.URL_ROOT;
+    for (i = 0; i < index.endpoints.length; i++) {
+      var endpoint = index.endpoints[i];
+      if (!wanted[endpoint[0]] || (method >= 0 && endpoint[1] != method))
+        continue;
+      results.push({
+        method: index.methods[endpoint[1]],
+        path: index.paths[endpoint[0]],
+        title: endpoint[4] || '',
+        uri: root + index.docs[endpoint[2]] + '#' + endpoint[3]
+      });
+    }
+    return results;
+  },
+
+  show: function(query) {
+    if (HTTPSearch.index === null) {
+      HTTPSearch.pending = query;
+      return;
+    }
+    var results = HTTPSearch.query(query);
+    if (!results.length)
+      return;
+    var list = $('<ul class="search http-search"/>');
+    for (var i = 0; i < results.length; i++) {
+      var result = results[i];
+      var item = $('<li/>');
+      $('<a/>').attr('href', result.uri)
+        .text(result.method + ' ' + result.path).appendTo(item);
+      if (result.title)
+        item.append($('<span/>').text(' \u2014 ' + result.title));
+      list.append(item);
+    }
+    var section = $('<div class="http-search-results"/>');
+    section.append($('<h2/>').text('HTTP Endpoints'));
+    section.append(list);
+    $('#search-results').before(section);
+  },
+
+  init: function() {
+    if (!$('#search-results').length)
+      return;
+    var params = $.getQueryParameters();
+    if (!params.q)
+      return;
+    HTTPSearch.show(params.q[0]);
+    $.ajax({
+      type: 'GET',
+      url: DOCUMENTATION_OPTIONS.URL_ROOT + '_static/httpindex.js',
+      dataType: 'script',
+      cache: true
+    });
+  }
+};
+
+$(document).ready(function() {
+  HTTPSearch.init();
+});
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.domains.http
+    ~~~~~~~~~~~~~~~~~~~
+
+    Suggestions for unresolved references in the HTTP domain.
+"""
+
+import heapq
+
+
+class NGramIndex(object):
+    """
+    Finds the names most similar to a misspelt one.
+
+    Names are indexed by their character n-grams, and similarity is the
+    Dice coefficient of the n-gram sets.  N-grams shared by more than
+    *max_postings* names (like a common ``get-api-v1-`` prefix) say
+    little about a name and are skipped when looking up, which keeps the
+    cost of a lookup about constant as the number of names grows.  Such
+    n-grams are assumed to be shared with every candidate when picking a
+    short list, which is then scored exactly.
+    """
+    def __init__(self, names, n=3, max_postings=500):
+        self.n = n
+        self.max_postings = max_postings
+        self.names = []
+        self.sizes = []
+        self.postings = {}      # n-gram -> list of name indices
+        for name in names:
+            grams = self.grams(name)
+            i = len(self.names)
+            self.names.append(name)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(i)
+
+    def grams(self, name):
+        """Returns the set of n-grams of *name*."""
+        padded = '^' + name + '$'
+        return set(padded[i:i + self.n]
+                   for i in xrange(len(padded) - self.n + 1))
+
+    def suggest(self, name, limit=3, cutoff=0.5):
+        """
+        Returns up to *limit* names most similar to *name*, with a
+        similarity of at least *cutoff*, most similar first.
+        """
+        grams = self.grams(name)
+        shared = {}
+        skipped = 0
+        for gram in grams:
+            postings = self.postings.get(gram, ())
+            if len(postings) > self.max_postings:
+                skipped += 1
+                continue
+            for i in postings:
+                shared[i] = shared.get(i, 0) + 1
+        size = len(grams)
+        estimates = ((2.0 * min(count + skipped, size, self.sizes[i]) /
+                      (size + self.sizes[i]), i)
+                     for i, count in shared.iteritems())
+        # Rescore a short list exactly, as the estimates are rough
+        scores = []
+        for estimate, i in heapq.nlargest(limit * 10, estimates):
+            other = self.names[i]
+            score = (2.0 * len(grams & self.grams(other)) /
+                     (size + self.sizes[i]))
+            if score >= cutoff and other != name:
+                scores.append((score, other))
+        return [other for score, other in heapq.nlargest(limit, scores)]
@@ -6,6 +6,11 @@
     Utilities for the HTTP domain.
 """
 
+from __future__ import with_statement
+
+import cPickle as pickle
+import hashlib
+import os
 import re
 import unicodedata
 
@@ -15,23 +20,166 @@ _slugify_strip_url_re = re.compile(r'[^\w\s/?=&#;{}-]')
 _slugify_hyphenate_re = re.compile(r'[^\w]+')
 
 
-def slugify(value, strip_re=_slugify_strip_re):
+class BoundedCache(object):
     """
-    Normalizes string, converts to lowercase, removes non-alpha
-    characters, and converts spaces to hyphens.
+    A mapping that holds on to at most about *maxsize* recently used items.
 
-    From Django's "django/template/defaultfilters.py".
+    Items live in two generations of plain dicts.  Hits in the older
+    generation are promoted to the current one, and once the current
+    generation is full, the older one is dropped wholesale.  This keeps
+    hits as cheap as a dict lookup while still evicting the least
+    recently used items first.
     """
+    def __init__(self, maxsize=16384):
+        self.maxsize = maxsize
+        self.current = {}
+        self.previous = {}
+
+    def get(self, key, default=None):
+        try:
+            return self.current[key]
+        except KeyError:
+            pass
+        try:
+            value = self.previous[key]
+        except KeyError:
+            return default
+        self[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        if len(self.current) >= self.maxsize // 2:
+            self.previous = self.current
+            self.current = {}
+        self.current[key] = value
+
+    def __len__(self):
+        return len(self.current) + len(self.previous)
+
+    def items(self):
+        """Returns a list of the (key, value) pairs, oldest first."""
+        return self.previous.items() + self.current.items()
+
+    def clear(self):
+        self.current = {}
+        self.previous = {}
+
+
+class PersistentCache(object):
+    """
+    Base class of caches which can be saved to and loaded from a file, to
+    be kept across incremental builds.
+
+    Subclasses keep their items in the mapping ``self.cache`` and add
+    them with :meth:`add`.  Values are pickled as returned by
+    :meth:`dump_value` and restored by :meth:`load_value`, so that the
+    file holds only builtin types.
+
+    A forked process, like a parallel reader, only changes its own copy
+    of the cache.  The items it adds are kept in ``self.added`` too, to
+    be sent back and passed to :meth:`merge` in the main process.
+    """
+    # Bump this in subclasses when the values or how they are made change
+    version = 1
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.dirty = False
+        self.pid = os.getpid()
+        self.added = {}
+
+    def add(self, key, value):
+        """Adds an item to the cache."""
+        self.cache[key] = value
+        self.dirty = True
+        if os.getpid() != self.pid:
+            self.added[key] = value
+
+    def merge(self, items):
+        """Adds the *items* a forked process added to its copy."""
+        for key, value in items.iteritems():
+            self.cache[key] = value
+        if items:
+            self.dirty = True
+
+    def dump_value(self, value):
+        return value
+
+    def load_value(self, value):
+        return value
+
+    def load(self, filename):
+        """Fills the cache from *filename*, ignoring unusable files."""
+        try:
+            with open(filename, 'rb') as f:
+                version, items = pickle.load(f)
+        except Exception:
+            return
+        if version != self.version:
+            return
+        for key, value in items.iteritems():
+            self.cache[key] = self.load_value(value)
+
+    def save(self, filename):
+        """Writes the cache to *filename*, if anything was added to it."""
+        if not self.dirty:
+            return
+        items = dict((key, self.dump_value(value))
+                     for key, value in self.cache.items())
+        with open(filename, 'wb') as f:
+            pickle.dump((self.version, items), f, pickle.HIGHEST_PROTOCOL)
+        self.dirty = False
+
+
+_slugify_cache = BoundedCache()
+
+
+def _slugify(value, strip_re):
     if not isinstance(value, unicode):
         value = unicode(value)
-    value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore')
+    try:
+        # NFKD leaves pure ASCII alone, so it can be skipped
+        value = value.encode('ascii')
+    except UnicodeEncodeError:
+        value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore')
     value = unicode(strip_re.sub('', value).strip().lower())
     return _slugify_hyphenate_re.sub('-', value)
 
 
+def slugify(value, strip_re=_slugify_strip_re):
+    """
+    Normalizes string, converts to lowercase, removes non-alpha
+    characters, and converts spaces to hyphens.
+
+    From Django's "django/template/defaultfilters.py".
+
+    Results are memoized in a :class:`BoundedCache`.
+    """
+    try:
+        key = (value, strip_re)
+        slug = _slugify_cache.get(key)
+    except TypeError:
+        # Unhashable value
+        return _slugify(value, strip_re)
+    if slug is None:
+        slug = _slugify_cache[key] = _slugify(value, strip_re)
+    return slug
+
+
 def slugify_url(value):
     """
     Normalizes URL, converts to lowercase, removes non-URL
     characters, and converts non-alpha characters to hyphens.
     """
     return slugify(value, strip_re=_slugify_strip_url_re)
+
+
+def hashed_anchor(prefix, key, readable=24):
+    """
+    Returns a short anchor for *key*, made of the slugified *prefix*, cut
+    to *readable* characters, and a stable hash of *key*.
+    """
+    if isinstance(key, unicode):
+        key = key.encode('utf-8')
+    slug = slugify(prefix)[:readable].strip('-')
+    return slug + '-' + hashlib.sha1(key).hexdigest()[:8]
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.domains.http
+    ~~~~~~~~~~~~~~~~~~~
+
+    Introspection of the URL map of a WSGI application, for the
+    ``http:autoroutes`` directive.
+
+    Works with Werkzeug ``Map`` objects, like the ``url_map`` of a Flask
+    application, whose view functions provide the descriptions.
+"""
+
+import os
+import pkgutil
+import re
+import sys
+
+from sphinx.util.docstrings import prepare_docstring
+
+from sphinx_http_domain.routetables import Route
+from sphinx_http_domain.utils import PersistentCache
+
+
+# RE for a Werkzeug rule placeholder, like <int(min=1):id> or <name>
+placeholder_re = re.compile(r'<(?:([^<>:(]+)(?:\([^)]*\))?:)?([^<>:]+)>')
+
+# Types of path arguments by converter; other converters keep their name
+converter_types = {
+    'default': '',
+    'string': '',
+    'int': 'integer',
+    'float': 'float',
+    'path': 'path',
+    'uuid': 'uuid',
+    'any': '',
+}
+
+# Methods Werkzeug adds to every rule, which are not documented
+implicit_methods = ('HEAD', 'OPTIONS')
+
+
+class AppError(Exception):
+    """Raised for applications which cannot be introspected."""
+
+
+def split_spec(spec):
+    """
+    Splits *spec*, like ``package.module:app`` or ``package.module.app``,
+    into the module name and the attribute name.
+    """
+    if ':' in spec:
+        modname, attr = spec.split(':', 1)
+    else:
+        modname, _, attr = spec.rpartition('.')
+    if not modname or not attr:
+        raise AppError('%r is not of the form module:object' % spec)
+    return modname, attr
+
+
+def import_object(spec):
+    """Imports and returns the object named by *spec*."""
+    modname, attr = split_spec(spec)
+    try:
+        __import__(modname)
+        obj = sys.modules[modname]
+        for part in attr.split('.'):
+            obj = getattr(obj, part)
+    except Exception, err:
+        raise AppError('cannot import %s: %s' % (spec, err))
+    return obj
+
+
+def module_file(modname):
+    """
+    Returns the source file of the module *modname*, without importing
+    it, or None.
+    """
+    try:
+        loader = pkgutil.get_loader(modname)
+        return loader.get_filename(modname)
+    except Exception:
+        return None
+
+
+def rule_signature(rule):
+    """
+    Returns the path of the Werkzeug *rule*, with placeholders as
+    ``{arg}``, and a list of (type, name) of its arguments.
+    """
+    args = []
+
+    def replace(m):
+        converter, name = m.groups()
+        converter = (converter or 'default').strip()
+        args.append((converter_types.get(converter, converter),
+                     name.strip()))
+        return '{%s}' % name.strip()
+
+    return placeholder_re.sub(replace, rule), args
+
+
+def view_docstring(view, method):
+    """
+    Returns the docstring of *view* for *method*, looking into the
+    class of class-based views.
+    """
+    view_class = getattr(view, 'view_class', None)
+    if view_class is not None:
+        handler = getattr(view_class, method.lower(), None)
+        if handler is not None and handler.__doc__:
+            return handler.__doc__
+        return view_class.__doc__
+    return getattr(view, '__doc__', None)
+
+
+def routes_from_app(app, prefix=None):
+    """
+    Returns a tuple of :class:`Route` for the URL map of *app*, a Flask
+    application or anything else with a Werkzeug ``url_map``, and the
+    set of the source files of the view functions.
+    """
+    url_map = getattr(app, 'url_map', app)
+    if not hasattr(url_map, 'iter_rules'):
+        raise AppError('%r has no URL map' % (app,))
+    views = getattr(app, 'view_functions', {})
+    routes = []
+    sources = set()
+    for rule in url_map.iter_rules():
+        if prefix and not rule.rule.startswith(prefix):
+            continue
+        path, args = rule_signature(rule.rule)
+        view = views.get(rule.endpoint)
+        if view is not None:
+            module = sys.modules.get(getattr(view, '__module__', None))
+            filename = getattr(module, '__file__', None)
+            if filename:
+                sources.add(source_file(filename))
+        methods = sorted(method for method in (rule.methods or ('GET',))
+                         if method not in implicit_methods)
+        for method in methods:
+            doc = view is not None and view_docstring(view, method) or ''
+            lines = prepare_docstring(doc) if doc else []
+            while lines and not lines[-1].strip():
+                lines.pop()
+            documented = '\n'.join(lines)
+            argfields = tuple(
+                ((typ + ' ' + name).strip(), '') for typ, name in args
+                if not re.search(r'^:(?:arg|argument|patharg)\s+(?:\S+\s+)?'
+                                 + re.escape(name) + r'\s*:',
+                                 documented, re.M)
+            )
+            routes.append(Route(u'%s %s' % (method, path), None,
+                                tuple(lines), argfields, (), ()))
+    routes.sort(key=lambda route: route.sig.split(' ', 1)[::-1])
+    return tuple(routes), sources
+
+
+def source_file(filename):
+    """Returns the source file for a possibly compiled module file."""
+    if filename.endswith(('.pyc', '.pyo')):
+        filename = filename[:-1]
+    return os.path.abspath(filename)
+
+
+def mtimes(filenames):
+    """Returns a dict of the modification times of *filenames*."""
+    result = {}
+    for filename in filenames:
+        try:
+            result[filename] = os.stat(filename).st_mtime
+        except OSError:
+            result[filename] = None
+    return result
+
+
+class AppRouteCache(PersistentCache):
+    """
+    Remembers the routes of applications, keyed by the application spec
+    and prefix, along with the modification times of the application
+    module and of the modules of its views.  While none of them changes,
+    the application is neither imported nor walked again.
+    """
+    # Bump this when Route or routes_from_app() change
+    version = 1
+
+    def __init__(self):
+        # (spec, prefix) -> (mtimes, routes)
+        PersistentCache.__init__(self, {})
+
+    def get(self, spec, prefix=None):
+        """
+        Returns the routes of the application *spec*, and the source
+        files they depend on.
+        """
+        key = (spec, prefix or '')
+        cached = self.cache.get(key)
+        if cached is not None:
+            files, routes = cached
+            if files and mtimes(files) == files:
+                return routes, set(files)
+        app = import_object(spec)
+        routes, sources = routes_from_app(app, prefix)
+        filename = module_file(split_spec(spec)[0])
+        if filename:
+            sources.add(source_file(filename))
+        self.add(key, (mtimes(sources), routes))
+        return routes, sources
+
+    def dump_value(self, value):
+        files, routes = value
+        return files, tuple(tuple(route) for route in routes)
+
+    def load_value(self, value):
+        files, routes = value
+        return files, tuple(Route(*route) for route in routes)
+
+
+app_route_cache = AppRouteCache()